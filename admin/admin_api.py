@@ -8,6 +8,7 @@ from admin.admin_database import (
     get_all_field_configs, get_active_field_configs, 
     create_field_config, update_field_config, delete_field_config
 )
+from app.slots import clear_field_config_cache
 
 router = APIRouter()
 templates = Jinja2Templates(directory="admin/templates")
@@ -72,6 +73,7 @@ async def create_field(field_config: FieldConfigCreate):
             field_config.question_text,
             field_config.is_required
         )
+        clear_field_config_cache()
         return {"success": True, "field_config": result}
     except Exception as e:
         print(f"API error in create_field: {e}")
@@ -89,6 +91,7 @@ async def update_field(field_id: int, field_config: FieldConfigUpdate):
         if not result:
             raise HTTPException(status_code=404, detail="Field configuration not found")
         
+        clear_field_config_cache()
         return {"success": True, "field_config": result}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -101,6 +104,7 @@ async def delete_field(field_id: int):
         if not success:
             raise HTTPException(status_code=404, detail="Field configuration not found")
         
+        clear_field_config_cache()
         return {"success": True, "message": "Field configuration deleted"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -119,6 +123,7 @@ async def toggle_field_active(field_id: int):
         # Toggle active status
         new_active = not current_config['is_active']
         result = update_field_config(field_id, is_active=new_active)
+        clear_field_config_cache()
         
         return {"success": True, "field_config": result}
     except Exception as e:
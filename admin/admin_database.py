@@ -1,16 +1,44 @@
 # admin_database.py
 import os
+import threading
 import psycopg2
 import psycopg2.extras
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
 import json
 from typing import List, Dict, Optional
 
 DATABASE_URL = os.environ.get("DATABASE_URL")
 
+# Admin queries reuse a small pool of connections instead of connecting per call
+ADMIN_DB_POOL_MAX = 4
+_pool: Optional[ThreadedConnectionPool] = None
+_pool_lock = threading.Lock()
+_pool_slots = threading.BoundedSemaphore(ADMIN_DB_POOL_MAX)
+
 def get_db_connection():
-    """Get database connection."""
-    return psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
+    """Check out a pooled database connection; hand it back with release_db_connection."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(1, ADMIN_DB_POOL_MAX, DATABASE_URL, cursor_factory=RealDictCursor)
+    _pool_slots.acquire()
+    try:
+        return _pool.getconn()
+    except Exception:
+        _pool_slots.release()
+        raise
+
+def release_db_connection(conn):
+    """Return a connection to the pool, discarding it if the server closed it."""
+    if not conn.closed:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            pass
+    _pool.putconn(conn, close=bool(conn.closed))
+    _pool_slots.release()
 
 def init_admin_tables():
     """Initialize admin tables for custom field configuration."""
@@ -60,7 +88,7 @@ def init_admin_tables():
         conn.rollback()
         raise e
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def get_active_field_configs() -> List[Dict]:
     """Get all active field configurations."""
@@ -74,7 +102,7 @@ def get_active_field_configs() -> List[Dict]:
             """)
             return [dict(row) for row in cur.fetchall()]
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def get_all_field_configs() -> List[Dict]:
     """Get all field configurations for admin interface."""
@@ -87,7 +115,7 @@ def get_all_field_configs() -> List[Dict]:
             """)
             return [dict(row) for row in cur.fetchall()]
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def create_field_config(field_name: str, field_label: str, field_type: str, question_text: str, is_required: bool = False) -> Dict:
     """Create a new field configuration."""
@@ -132,7 +160,7 @@ def create_field_config(field_name: str, field_label: str, field_type: str, ques
         print(f"General error in create_field_config: {e}")
         raise ValueError(f"Error creating field: {e}")
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def update_field_config(field_id: int, **kwargs) -> Dict:
     """Update field configuration."""
@@ -168,7 +196,7 @@ def update_field_config(field_id: int, **kwargs) -> Dict:
         conn.rollback()
         raise e
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def delete_field_config(field_id: int) -> bool:
     """Delete field configuration."""
@@ -183,7 +211,7 @@ def delete_field_config(field_id: int) -> bool:
         conn.rollback()
         raise e
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 # Initialize tables on import
 try:
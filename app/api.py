@@ -1,38 +1,60 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from app.models import AskRequest, AskResponse, CrawlRequest, CrawlResponse, ChatRequest, ChatResponse
 from app.retriever import search
-from app.indexer import upsert_chunks
-from app.chunking import TextChunker
+from app.indexer import upsert_chunks, CHROMA_UPSERT_BATCH_SIZE
+from app.chunking import chunk_pages
 from app.config import OPENAI_API_KEY
-from crawler.firecrawl_crawl import FirecrawlClient
+from crawler.firecrawl_crawl import get_firecrawl_client
 from chromadb import PersistentClient
-from utils.theme import mentions_theme, resolve_theme_url
+from utils.theme import THEME_KEYS, mentions_theme, resolve_theme_url
+from utils.keyword_scan import KeywordScanner
+from utils.regex_compat import compile_pattern
 from utils.lead import extract_name, extract_phone, is_lead_only
-from utils.location import extract_location, mentions_location_need
-from app.database import save_lead, get_lead, get_all_leads, get_merchant_config
+from utils.location import extract_location
+from utils.parser_my_style_location import parse_message, extract_style
+from app.database import save_lead, get_lead, get_all_leads, get_merchant_config, get_merchant_google_tokens, ensure_schema
 from app.chat_logger import chat_logger
 from .mcp_tools import router as mcp_router
-import requests
-import time
+import asyncio
+import functools
+import heapq
+import httpx
+import json
 import os
 import re
-from typing import Optional, Dict, Tuple
+from typing import Optional, Dict, Tuple, Union
+from collections import defaultdict, deque
 from dataclasses import dataclass, asdict
+from datetime import datetime
 from enum import Enum, auto
 
-app = FastAPI(title="RAG Site API", version="1.0.0")
+# Optional orjson support for faster response encoding. If not installed, stdlib json is used.
+try:
+    import orjson  # noqa: F401
+    HAS_ORJSON = True
+except Exception:
+    HAS_ORJSON = False
+
+FastJSONResponse = ORJSONResponse if HAS_ORJSON else JSONResponse
+
+app = FastAPI(title="RAG Site API", version="1.0.0",
+              default_response_class=FastJSONResponse)
 app.include_router(mcp_router)
 
-# Include merchant router
-from app.merchant_api import router as merchant_router
-app.include_router(merchant_router, prefix="/api/v1")
+# Merchant and admin routers pull in the admin/DB stack at import; set
+# ENABLE_ADMIN=false on chat-only deployments to skip them and start faster
+ENABLE_ADMIN = os.getenv("ENABLE_ADMIN", "true").lower() != "false"
+if ENABLE_ADMIN:
+    # Include merchant router
+    from app.merchant_api import router as merchant_router
+    app.include_router(merchant_router, prefix="/api/v1")
 
-# Include admin router
-from admin.admin_api import router as admin_router
-app.include_router(admin_router)
+    # Include admin router
+    from admin.admin_api import router as admin_router
+    app.include_router(admin_router)
 
 # Include appointment router for Google Calendar integration
 from app.appointment_api import router as appointment_router
@@ -61,41 +83,58 @@ except Exception:
     chroma_client = None
     chroma_collection = None
 
-# In-memory session store (replace with Redis/DB in prod)
-CHAT_SESSIONS = {
-}  # {thread_id: {"summary": str, "turns": [(role, content), ...], "first_turn": bool, "name": str, "phone": str}}
+# Session store shared across workers via Redis (in-process fallback)
+from app.session_store import SessionStore
+from app.semantic_cache import SemanticCache, SEMANTIC_CACHE_ENABLED
+CHAT_SESSIONS = SessionStore("chat")  # {thread_id: {"summary": str, "summary_notes": [(turn_entries, str)], "turns": deque[(role, content)], "turn_entries": int, "first_turn": bool, "name": str, "phone": str}}
+
+# Only the latest exchanges are replayed to the LLM; older ones live on in the summary
+CHAT_TURNS_KEPT = 8
+# The prompt uses at most 2000 summary characters, so longer summaries are trimmed at the source
+SUMMARY_MAX_CHARS = 2000
+# Re-summarise with the LLM every N exchanges; in between, user messages are noted verbatim
+SUMMARY_EVERY_TURNS = 3
+
+
+def record_turn(st: dict, user_msg: str, reply: str) -> None:
+    """Append a user/assistant exchange to the session's bounded turn history."""
+    st["turns"].append(("user", user_msg))
+    st["turns"].append(("assistant", reply))
+    st["turn_entries"] = st.get("turn_entries", 0) + 2
 
 # Enhanced Conversation Management Configuration
 PORTFOLIO_URL = "https://jablancinteriors.com/projects/"
 
 # Import modularized components
 from app.intents import (
-    detect_intent, Intent, is_portfolio_intent, is_generic_id_intent, 
-    rag_answer_one_liner, portfolio_preview, respond_with_intent
+    detect_intent, Intent, is_portfolio_intent, 
+    rag_answer_one_liner, portfolio_preview, respond_with_intent, scan_turn_keywords,
+    is_small_talk
 )
 from app.slots import (
-    ConversationState, Slot, QUESTIONS, APPOINTMENT_MESSAGES,
+    ConversationState, Slot, QUESTIONS, QUESTIONS_WITH_HINTS, APPOINTMENT_MESSAGES,
     next_phone_prompt, mark_phone_prompted, next_missing_after_portfolio,
-    next_non_phone_slot_question, dynamic_next_slot, is_ready_for_appointment_dynamic,
+    next_non_phone_slot_question,
+    slot_status, mark_question_asked,
     generate_appointment_message, get_slot_question_with_hints,
     get_checklist_progress, get_missing_required_fields, get_dynamic_field_configs
 )
 
+# Budget patterns: number + k, number + thousand, rm + number, etc.
+BUDGET_PATTERNS = [compile_pattern(p) for p in (
+    r'\b(\d+[,.]?\d*)\s*k\b',  # 50k, 100k
+    r'\b(\d+[,.]?\d*)\s*thousand\b',  # 50 thousand
+    r'\brm\s*(\d+[,.]?\d*)\s*k?\b',  # rm 50k, rm 100
+    r'\b(\d+[,.]?\d*)\s*budget\b',  # 50k budget
+    r'\ballocated?\s*(\d+[,.]?\d*)\s*k?\b',  # allocated 50k
+)]
+
 def extract_budget(text: str) -> Optional[str]:
     """Extract budget information from user text."""
     text_lower = text.lower()
     
-    # Budget patterns: number + k, number + thousand, rm + number, etc.
-    budget_patterns = [
-        r'\b(\d+[,.]?\d*)\s*k\b',  # 50k, 100k
-        r'\b(\d+[,.]?\d*)\s*thousand\b',  # 50 thousand
-        r'\brm\s*(\d+[,.]?\d*)\s*k?\b',  # rm 50k, rm 100
-        r'\b(\d+[,.]?\d*)\s*budget\b',  # 50k budget
-        r'\ballocated?\s*(\d+[,.]?\d*)\s*k?\b',  # allocated 50k
-    ]
-    
-    for pattern in budget_patterns:
-        match = re.search(pattern, text_lower)
+    for pattern in BUDGET_PATTERNS:
+        match = pattern.search(text_lower)
         if match:
             amount = match.group(1)
             # Return in a consistent format
@@ -127,18 +166,11 @@ def enhanced_late_capture(user_text: str, state: ConversationState) -> None:
         state.phone = phone
     
     # Style & Location extraction
-    try:
-        from utils.parser_my_style_location import parse_message
-        parsed = parse_message(user_text)
-        if parsed.get("style_theme") and not state.style:
-            state.style = parsed["style_theme"]
-        if parsed.get("location") and not state.location:
-            state.location = parsed["location"]
-    except ImportError:
-        # Fallback to basic location extraction
-        location = extract_location(user_text)
-        if location and not state.location:
-            state.location = location
+    parsed = parse_message(user_text)
+    if parsed.get("style_theme") and not state.style:
+        state.style = parsed["style_theme"]
+    if parsed.get("location") and not state.location:
+        state.location = parsed["location"]
     
     # Budget extraction
     if not state.budget:
@@ -148,20 +180,24 @@ def enhanced_late_capture(user_text: str, state: ConversationState) -> None:
 
 # Core enhanced controller
 REASK_PREFIX = "Just to confirm,"
+REASK_QUESTIONS = {slot: f"{REASK_PREFIX} {q}" for slot, q in QUESTIONS_WITH_HINTS.items()}
 
 def enhanced_handle_turn(user_text: str, state: ConversationState) -> str:
     """Enhanced slot-driven conversation handler with RAG integration and appointment scheduling."""
     state.turn_index += 1
+    tags = scan_turn_keywords(user_text)
 
     # 1) Late-capture anything provided this turn
     enhanced_late_capture(user_text, state)
 
     # 2) Check if ready for appointment after capture using dynamic config
-    if is_ready_for_appointment_dynamic(state):
+    ready, next_question = slot_status(state)
+    if ready:
         return generate_appointment_message(state)
 
-    # 3) Intent-first response with built-in follow-up
-    intent = detect_intent(user_text)
+    # 3) Intent-first response with built-in follow-up; "hi"/"ok" style replies
+    #    skip detection and fall through to the next question
+    intent = Intent.NONE if is_small_talk(user_text) else detect_intent(user_text)
     intent_reply = respond_with_intent(intent, user_text, state, PORTFOLIO_URL)
     if intent_reply:
         return intent_reply
@@ -170,18 +206,13 @@ def enhanced_handle_turn(user_text: str, state: ConversationState) -> str:
     slot = state.next_slot()
 
     # 5) If user expressed generic ID intent but we're still missing style, probe style first
-    if slot in (Slot.NAME, Slot.PHONE) and is_generic_id_intent(user_text) and not state.style:
-        rag_line = rag_answer_one_liner(user_text, state=state) or ""
+    if slot in (Slot.NAME, Slot.PHONE) and intent == Intent.GENERIC_ID and not state.style:
+        rag_line = rag_answer_one_liner(user_text, state=state, tags=tags) or ""
         style_probe = QUESTIONS[Slot.STYLE]
         return (rag_line + ("\n" if rag_line else "") + style_probe).strip()
 
-    # 6) Check if user answered current slot this turn - use dynamic slot checking
-    next_question = dynamic_next_slot(state)
+    # 6) Ask the next missing required field picked by slot_status above
     if not next_question:
-        # Check for appointment readiness after slot progression
-        if is_ready_for_appointment_dynamic(state):
-            return generate_appointment_message(state)
-        
         # Optional: if style was just captured, send matching project link
         if hasattr(state, 'style') and state.style and mentions_theme(user_text):
             link = resolve_theme_url(user_text)
@@ -192,6 +223,7 @@ def enhanced_handle_turn(user_text: str, state: ConversationState) -> str:
     
     # If there's a next question to ask, return it
     if next_question:
+        mark_question_asked(state, next_question)
         return next_question
 
     # 7) Enhanced off-topic handling with smart phone policy
@@ -199,8 +231,7 @@ def enhanced_handle_turn(user_text: str, state: ConversationState) -> str:
     if not state.name and any(trigger in user_text.lower() for trigger in ["price", "cost", "how much", "quote", "quotation", "timeline", "revision"]):
         return "Before that, can I know who am I speaking to?"
     
-    rag_line = rag_answer_one_liner(user_text, state=state)
-    question = get_slot_question_with_hints(slot)
+    rag_line = rag_answer_one_liner(user_text, state=state, tags=tags)
 
     if slot == Slot.PHONE and not state.phone:
         phone_prompt = next_phone_prompt(state)
@@ -221,17 +252,22 @@ def enhanced_handle_turn(user_text: str, state: ConversationState) -> str:
 
     # Non-phone slots: answer side-topic briefly then re-ask
     if rag_line:
-        return f"{rag_line}\n{REASK_PREFIX} {question}"
-    return question
+        return f"{rag_line}\n{REASK_QUESTIONS[slot]}"
+    return get_slot_question_with_hints(slot)
 
 # Enhanced session management for legacy compatibility
-ENHANCED_SESSIONS: Dict[str, ConversationState] = {}
+ENHANCED_SESSIONS = SessionStore("enhanced")
 
 def get_enhanced_state(user_id: str) -> ConversationState:
     """Get enhanced conversation state for a user."""
-    if user_id not in ENHANCED_SESSIONS:
-        ENHANCED_SESSIONS[user_id] = ConversationState(user_id=user_id)
-    return ENHANCED_SESSIONS[user_id]
+    state = ENHANCED_SESSIONS.get(user_id)
+    if state is None:
+        state = ConversationState(user_id=user_id)
+    return state
+
+def save_enhanced_state(user_id: str, state: ConversationState) -> None:
+    """Persist enhanced conversation state for a user."""
+    ENHANCED_SESSIONS.save(user_id, state)
 
 # Enhanced ask endpoint using the optimized controller
 @app.post("/ask_enhanced")
@@ -243,7 +279,7 @@ async def enhanced_ask(payload: dict):
     user_id = payload.get("user_id", "anon")
     text = payload.get("text", "")
     
-    state = get_enhanced_state(user_id)
+    state = await asyncio.to_thread(get_enhanced_state, user_id)
     
     # Log user message
     state_info = {
@@ -252,7 +288,8 @@ async def enhanced_ask(payload: dict):
     }
     chat_logger.log_user_message(user_id, text, state_info)
     
-    reply = enhanced_handle_turn(text, state)
+    reply = await asyncio.to_thread(enhanced_handle_turn, text, state)
+    await asyncio.to_thread(save_enhanced_state, user_id, state)
     
     # Log bot response
     response_state_info = {
@@ -309,7 +346,7 @@ def health():
 def leads_endpoint():
     """Get all leads from database"""
     try:
-        leads = get_all_leads()
+        leads = list(get_all_leads())
         return {"leads": leads, "count": len(leads)}
     except Exception as e:
         return {"error": str(e), "leads": [], "count": 0}
@@ -365,8 +402,9 @@ def get_chat_log_content(filename: str):
         raise HTTPException(status_code=500, detail=f"Error reading chat log: {str(e)}")
 
 
+@functools.lru_cache(maxsize=8)
 def load_system_prompt(tone_type: str = "customer_support") -> str:
-    """Load system prompt from tone file."""
+    """Load system prompt from tone file (cached per tone)."""
     tone_file = f"tone/{tone_type}.txt"
     try:
         with open(tone_file, 'r', encoding='utf-8') as f:
@@ -385,7 +423,50 @@ def load_system_prompt(tone_type: str = "customer_support") -> str:
                 "Cite sources by listing their URLs at the end.")
 
 
-def call_chat(messages, temperature=0.2, max_tokens=None):
+# Admin endpoint, so it is only served where the admin router is
+if ENABLE_ADMIN:
+    @app.post("/admin/api/reload-prompts")
+    def reload_prompts():
+        """Drop cached tone prompts so edited tone/*.txt files are read on the next request."""
+        load_system_prompt.cache_clear()
+        return {"success": True, "message": "System prompts reloaded"}
+
+
+# Optional HTTP/2 support for httpx. If h2 is not installed, HTTP/1.1 keep-alive is used.
+try:
+    import h2  # noqa: F401
+    HAS_HTTP2 = True
+except Exception:
+    HAS_HTTP2 = False
+
+# Shared async HTTP client so concurrent requests reuse pooled connections to OpenAI
+OAI_CLIENT = httpx.AsyncClient(
+    headers={
+        "Authorization": f"Bearer {OPENAI_API_KEY}",
+        "Content-Type": "application/json"
+    },
+    timeout=120,
+    http2=HAS_HTTP2,
+    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32))
+
+
+@app.on_event("startup")
+def init_database():
+    ensure_schema()
+
+
+@app.on_event("shutdown")
+async def close_oai_client():
+    await OAI_CLIENT.aclose()
+
+
+OAI_BUSY_REPLY = "I'm temporarily unable to respond due to high demand. Please try again in a moment."
+
+# Replies to near-duplicate questions over the same retrieved context
+CHAT_REPLY_CACHE = SemanticCache()
+
+
+async def call_chat(messages, temperature=0.2, max_tokens=None):
     try:
         json_data = {
             "model": "gpt-4o-mini",
@@ -395,41 +476,92 @@ def call_chat(messages, temperature=0.2, max_tokens=None):
         if max_tokens:
             json_data["max_tokens"] = max_tokens
 
-        r = requests.post("https://api.openai.com/v1/chat/completions",
-                          headers={
-                              "Authorization": f"Bearer {OPENAI_API_KEY}",
-                              "Content-Type": "application/json"
-                          },
-                          json=json_data,
-                          timeout=120)
+        r = await OAI_CLIENT.post("https://api.openai.com/v1/chat/completions",
+                                  json=json_data)
         r.raise_for_status()
         return r.json()["choices"][0]["message"]["content"]
-    except requests.exceptions.HTTPError as e:
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 503:
+            return OAI_BUSY_REPLY
+        raise e
+
+
+async def call_chat_stream(messages, temperature=0.2, max_tokens=None):
+    """Yield completion text as OpenAI streams it back."""
+    json_data = {
+        "model": "gpt-4o-mini",
+        "messages": messages,
+        "temperature": temperature,
+        "stream": True
+    }
+    if max_tokens:
+        json_data["max_tokens"] = max_tokens
+
+    try:
+        async with OAI_CLIENT.stream("POST", "https://api.openai.com/v1/chat/completions",
+                                     json=json_data) as r:
+            r.raise_for_status()
+            async for line in r.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                data = line[len("data: "):]
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or []
+                delta = choices[0].get("delta", {}).get("content") if choices else None
+                if delta:
+                    yield delta
+    except httpx.HTTPStatusError as e:
         if e.response.status_code == 503:
-            return "I'm temporarily unable to respond due to high demand. Please try again in a moment."
+            yield OAI_BUSY_REPLY
+            return
         raise e
 
 
+def sse_event(data, event: Optional[str] = None) -> str:
+    """Format one server-sent event with a JSON payload."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+async def stream_answer(messages, sources):
+    """Stream an answer as SSE: sources first, then text deltas, then a done marker."""
+    yield sse_event(sources, event="sources")
+    async for delta in call_chat_stream(messages):
+        yield sse_event(delta)
+    yield sse_event("[DONE]", event="done")
+
+
+GREETING_RE = compile_pattern(
+    r'^\s*(hi|hello|hey|morning|good (morning|afternoon|evening))\b', ignore_case=True)
+ASSIST_YOU_RE = compile_pattern(r'\bassist you\b', ignore_case=True)
+LEADING_HELLO_RE = compile_pattern(r'^\s*(hi|hello|hey)[^a-z0-9]+', ignore_case=True)
+# Lookbehind is not supported by RE2, so this one always uses re
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.?!])\s+')
+WHY_CHOOSE_RE = compile_pattern(r'\bwhy\b.*\bchoose\b', ignore_case=True)
+
+
+def asks_why_choose(txt: str) -> bool:
+    """True for "why ... choose" questions; the regex only runs if both words appear."""
+    low = txt.lower()
+    return "why" in low and "choose" in low and bool(WHY_CHOOSE_RE.search(txt))
+
+
 def is_greeting(txt: str) -> bool:
-    return bool(
-        re.match(
-            r'^\s*(hi|hello|hey|morning|good (morning|afternoon|evening))\b',
-            txt.strip(), re.I))
+    return bool(GREETING_RE.match(txt.strip()))
 
 
 def postprocess(text: str, first_turn: bool) -> str:
     # remove exclamation marks, overly generic assistant phrasing
-    text = re.sub(r'\bassist you\b', 'help you', text,
-                  flags=re.I).replace('!', '').strip()
+    text = ASSIST_YOU_RE.sub('help you', text).replace('!', '').strip()
     if not first_turn:
-        text = re.sub(r'^\s*(hi|hello|hey)[^a-z0-9]+', '', text,
-                      flags=re.I).strip()
+        text = LEADING_HELLO_RE.sub('', text).strip()
     # cap 2 sentences
-    parts = re.split(r'(?<=[.?!])\s+', text)
+    parts = SENTENCE_SPLIT_RE.split(text)
     return ' '.join(parts[:2]).strip()
 
 
-def summarise(previous_summary, user_msg, assistant_msg):
+async def summarise(previous_summary, user_msg, assistant_msg):
     prompt = f"""Update the conversation summary (<=500 tokens), capturing user intent, decisions, names,
 preferences, and open items. First-person where relevant; no greetings.
 
@@ -443,7 +575,7 @@ latest_assistant:
 {assistant_msg}
 """
     try:
-        out = call_chat([{
+        out = await call_chat([{
             "role":
             "system",
             "content":
@@ -453,12 +585,56 @@ latest_assistant:
             "content": prompt
         }],
                         max_tokens=400)
-        return out
+        return out[:SUMMARY_MAX_CHARS]
     except:
         return previous_summary or ""
 
 
-def rewrite_query(summary, user_msg):
+# The LLM summary is stored beside the session, not inside it, so the background
+# refresh never rewrites (or is overwritten by) a concurrently saved turn
+SUMMARY_FIELD = "summary"
+
+
+def load_summary(st: dict, record: Optional[dict]) -> None:
+    """Rebuild st["summary"] from the last LLM summary plus the messages noted since."""
+    if "summary_notes" not in st:
+        # Sessions saved before the summary moved to its own key
+        st["summary_notes"] = [(0, st["summary"])] if st.get("summary") else []
+    upto = record["upto"] if record else -1
+    st["summary_notes"] = [(n, note) for n, note in st["summary_notes"] if n > upto]
+    parts = [record["text"]] if record and record["text"] else []
+    parts.extend(note for _, note in st["summary_notes"])
+    st["summary"] = " | ".join(parts)
+
+
+async def update_summary(thread_id: str, previous_summary: str, user_msg: str, assistant_msg: str,
+                         upto: int) -> None:
+    """Summarise the latest exchange after the reply is sent; the summary covers turn entries up to `upto`."""
+    summary = await summarise(previous_summary, user_msg, assistant_msg)
+
+    def store():
+        current = CHAT_SESSIONS.get_field(thread_id, SUMMARY_FIELD)
+        # A slower refresh started earlier must not replace a newer summary
+        if current is None or current["upto"] < upto:
+            CHAT_SESSIONS.save_field(thread_id, SUMMARY_FIELD, {"text": summary, "upto": upto})
+
+    await asyncio.to_thread(store)
+
+
+def queue_summary_update(st: dict, background_tasks: BackgroundTasks, thread_id: str,
+                         user_msg: str, reply: str) -> None:
+    """Schedule an LLM summary refresh every SUMMARY_EVERY_TURNS exchanges; note the message otherwise."""
+    st["turns_since_summary"] = st.get("turns_since_summary", 0) + 1
+    if st["turns_since_summary"] >= SUMMARY_EVERY_TURNS:
+        st["turns_since_summary"] = 0
+        background_tasks.add_task(update_summary, thread_id, st["summary"], user_msg, reply,
+                                  st["turn_entries"])
+    else:
+        st["summary_notes"].append((st["turn_entries"], user_msg[:200]))
+        st["summary"] = f"{st['summary']} | {user_msg[:200]}" if st["summary"] else user_msg[:200]
+
+
+async def rewrite_query(summary, user_msg):
     prompt = f"""Rewrite the user's question into a standalone query for retrieval.
 Use conversation_summary to resolve pronouns and include names/dates/scope.
 Return only the rewritten query.
@@ -470,7 +646,7 @@ user_question:
 {user_msg}
 """
     try:
-        return call_chat([{
+        return await call_chat([{
             "role":
             "system",
             "content":
@@ -496,32 +672,56 @@ def retrieve_for_chat(query, k=20):
         return {"documents": [[]], "metadatas": [[]], "distances": [[]]}
 
 
+# Best raw-message hit distance (Chroma's default L2 over unit vectors, 0 is an
+# exact match) at which the speculative hits are trusted without the rewrite
+RAW_HITS_MAX_DISTANCE = 0.6
+
+
 def rerank(query, hits, topn=5):
     # Optional: apply a cross-encoder or heuristic MMR
     # For now, simple diversity by section + distance score
     docs = hits["documents"][0]
     metas = hits["metadatas"][0]
     dists = hits["distances"][0]
-    triples = list(zip(docs, metas, dists))
-    # naive: sort by distance then pick diverse sections
-    triples.sort(key=lambda x: x[2])
+    n = len(dists)
+    # Rank a shortlist by distance first; only sort everything if dedup exhausts it
+    order = heapq.nsmallest(min(topn * 3, n), range(n), key=dists.__getitem__)
     seen = set()
     out = []
-    for t in triples:
-        sec = t[1].get("section") if t[1] else None
+    pos = 0
+    while len(out) < topn:
+        if pos == len(order):
+            if len(order) == n: break
+            order = sorted(range(n), key=dists.__getitem__)
+        i = order[pos]
+        pos += 1
+        sec = metas[i].get("section") if metas[i] else None
         if sec in seen: continue
         seen.add(sec)
-        out.append(t)
-        if len(out) >= topn: break
+        out.append((docs[i], metas[i], dists[i]))
     return out
 
 
+# Snippets included in the LLM context; rerank keeps a few more for source links
+CONTEXT_SNIPPETS = 3
+
+
 def build_context(snippets):
-    parts = []
-    for doc, meta, dist in snippets:
-        title = meta.get("title", "") if meta else ""
-        parts.append(f"[{title}] {doc}")
-    return "\n\n".join(parts[:3])
+    return "\n\n".join(
+        f"[{meta.get('title', '') if meta else ''}] {doc}"
+        for doc, meta, _ in snippets[:CONTEXT_SNIPPETS])
+
+
+# Keywords confirming a message is about style, used to validate extract_style hits
+STYLE_CONTEXT_KEYWORDS = ['style', 'design', 'modern', 'minimalist', 'contemporary', 'traditional', 
+                          'scandinavian', 'industrial', 'rustic', 'elegant', 'cozy', 'luxury', 
+                          'vintage', 'classic', 'aesthetic', 'theme', 'vibe', 'feel', 'look']
+
+# One pass over the lowercased turn reports theme and style-context mentions
+CHAT_KEYWORDS = KeywordScanner({
+    "theme": THEME_KEYS,
+    "style_context": STYLE_CONTEXT_KEYWORDS,
+})
 
 
 def need_contact(session):
@@ -561,8 +761,8 @@ def is_conversation_complete(session):
 
 
 @app.post("/ask", response_model=AskResponse)
-def ask(req: AskRequest):
-    hits = search(req.question, top_k=req.top_k or 6)
+async def ask(req: AskRequest):
+    hits = await asyncio.to_thread(search, req.question, top_k=req.top_k or 6)
     if not hits:
         return AskResponse(
             answer="I don't have that information in my knowledge base.",
@@ -589,21 +789,48 @@ def ask(req: AskRequest):
         "role": "user",
         "content": user
     }]
-    answer = call_chat(msg)
+    if req.stream:
+        return StreamingResponse(stream_answer(msg, list(dict.fromkeys(sources))),
+                                 media_type="text/event-stream")
+    answer = await call_chat(msg)
     return AskResponse(answer=answer, sources=list(dict.fromkeys(sources)))
 
 
 @app.post("/chat", response_model=ChatResponse)
-def chat_endpoint(req: ChatRequest):
+async def chat_endpoint(req: ChatRequest, background_tasks: BackgroundTasks):
     """Enhanced chat endpoint with conversation memory and Malaysian business tone."""
-    
-    st = CHAT_SESSIONS.setdefault(req.thread_id, {
+    st, summary_record = await asyncio.gather(
+        asyncio.to_thread(CHAT_SESSIONS.get, req.thread_id),
+        asyncio.to_thread(CHAT_SESSIONS.get_field, req.thread_id, SUMMARY_FIELD))
+    st = st or {
         "summary": "",
-        "turns": [],
+        "summary_notes": [],
+        "turns": deque(maxlen=CHAT_TURNS_KEPT),
+        "turn_entries": 0,
         "first_turn": True
-    })
+    }
+    load_summary(st, summary_record)
+    if not isinstance(st["turns"], deque):
+        # Sessions saved before turn history was bounded
+        st.setdefault("turn_entries", len(st["turns"]))
+        st["turns"] = deque(st["turns"], maxlen=CHAT_TURNS_KEPT)
+    try:
+        response = await handle_chat_turn(req, st, background_tasks)
+        if req.stream and isinstance(response, ChatResponse):
+            # Templated replies go out as a single done event so streaming clients see one protocol
+            return StreamingResponse(iter([sse_event(response.dict(), event="done")]),
+                                     media_type="text/event-stream")
+        return response
+    finally:
+        # Persist session state after every turn, whichever branch replied
+        await asyncio.to_thread(CHAT_SESSIONS.save, req.thread_id, st)
+
+
+async def handle_chat_turn(req: ChatRequest, st: dict, background_tasks: BackgroundTasks) -> Union[ChatResponse, StreamingResponse]:
+    """Run one /chat turn against the loaded session state."""
     first_turn = st["first_turn"]
     user_text = req.user_message
+    turn_tags = CHAT_KEYWORDS.scan(user_text.lower())
     
     # Log user message
     state_info = {
@@ -633,18 +860,15 @@ def chat_endpoint(req: ChatRequest):
         st["phone"] = phone
     if location and not st.get("location"):
         st["location"] = location
+    # Remember the first user message that mentioned a theme
+    if "theme" in turn_tags and not st.get("theme_interest"):
+        st["theme_interest"] = user_text
     
     # Check for style preference using advanced parser
-    from utils.parser_my_style_location import extract_style
-    
     if not st.get("style_preference"):
         style_result = extract_style(user_text)
         # Validate that this is actually a style-related message
-        style_keywords = ['style', 'design', 'modern', 'minimalist', 'contemporary', 'traditional', 
-                         'scandinavian', 'industrial', 'rustic', 'elegant', 'cozy', 'luxury', 
-                         'vintage', 'classic', 'aesthetic', 'theme', 'vibe', 'feel', 'look']
-        
-        has_style_context = any(keyword in user_text.lower() for keyword in style_keywords)
+        has_style_context = "style_context" in turn_tags
         
         if (style_result and style_result.get("theme") and style_result.get("theme") != "generic" 
             and has_style_context and len(user_text.strip()) > 3):
@@ -657,21 +881,13 @@ def chat_endpoint(req: ChatRequest):
     # Save to database when we have both name and phone
     if st.get("name") and st.get("phone"):
         try:
-            # Get the first message from conversation history
-            first_msg = st.get("turns")[0][1] if st.get("turns") and len(
-                st.get("turns")) > 0 else user_text
-            # Determine theme interest from conversation
-            theme_interest = ""
-            for turn in st.get("turns", []):
-                if mentions_theme(turn[1]) and turn[0] == "user":
-                    theme_interest = turn[1]
-                    break
-
-            save_lead(name=st["name"],
-                      phone=st["phone"],
-                      thread_id=req.thread_id,
-                      location=st.get("location", ""),
-                      style_preference=st.get("style_preference", ""))
+            await asyncio.to_thread(save_lead,
+                                    name=st["name"],
+                                    phone=st["phone"],
+                                    thread_id=req.thread_id,
+                                    location=st.get("location", ""),
+                                    style_preference=st.get("style_preference", ""),
+                                    theme_interest=st.get("theme_interest", ""))
             print(
                 f"✅ SAVED LEAD: {st['name']} - {st['phone']} - Thread: {req.thread_id}"
             )
@@ -679,16 +895,13 @@ def chat_endpoint(req: ChatRequest):
             print(f"Error saving lead: {e}")
 
     # Enhanced intent detection with optimized portfolio handling
-    from app.intents import detect_intent, respond_with_intent, Intent
-    from app.slots import ConversationState
-    
     # Create conversation state from session data
     conv_state = ConversationState(user_id=req.thread_id)
     conv_state.name = st.get("name")
     conv_state.phone = st.get("phone")  
     conv_state.location = st.get("location")
     conv_state.style = st.get("style_theme")
-    conv_state.turn_index = len(st.get("turns", [])) + 1
+    conv_state.turn_index = st["turn_entries"] + 1
     
     # Detect intent and respond with optimized handlers
     intent = detect_intent(req.user_message)
@@ -696,11 +909,10 @@ def chat_endpoint(req: ChatRequest):
         # Handle services and pricing intents immediately, even on first contact
         if intent in [Intent.SERVICES, Intent.PRICING]:
             portfolio_url = getattr(req, 'portfolio_url', 'https://jablancinteriors.com/projects/')
-            intent_reply = respond_with_intent(intent, req.user_message, conv_state, portfolio_url)
+            intent_reply = await asyncio.to_thread(respond_with_intent, intent, req.user_message, conv_state, portfolio_url)
             if intent_reply:
-                st["turns"].append(("user", req.user_message))
-                st["turns"].append(("assistant", intent_reply))
-                st["summary"] = summarise(st["summary"], req.user_message, intent_reply)
+                record_turn(st, req.user_message, intent_reply)
+                queue_summary_update(st, background_tasks, req.thread_id, req.user_message, intent_reply)
                 st["first_turn"] = False
                 
                 # Log bot response for services/pricing intent
@@ -721,11 +933,10 @@ def chat_endpoint(req: ChatRequest):
         # Handle other intents with existing logic
         elif intent in [Intent.PORTFOLIO, Intent.OFFICE_ADDRESS]:
             portfolio_url = getattr(req, 'portfolio_url', 'https://jablancinteriors.com/projects/')
-            intent_reply = respond_with_intent(intent, req.user_message, conv_state, portfolio_url)
+            intent_reply = await asyncio.to_thread(respond_with_intent, intent, req.user_message, conv_state, portfolio_url)
             if intent_reply:
-                st["turns"].append(("user", req.user_message))
-                st["turns"].append(("assistant", intent_reply))
-                st["summary"] = summarise(st["summary"], req.user_message, intent_reply)
+                record_turn(st, req.user_message, intent_reply)
+                queue_summary_update(st, background_tasks, req.thread_id, req.user_message, intent_reply)
                 st["first_turn"] = False
                 
                 # Log bot response for portfolio/office intent
@@ -747,13 +958,13 @@ def chat_endpoint(req: ChatRequest):
         final_name = st.get("name", "there")
         
         # Attempt to schedule appointment automatically
-        from app.calendar_integration import schedule_appointment_for_lead
-        from app.database import get_merchant_google_tokens
+        from app.calendar_integration import schedule_appointment_for_lead, run_calendar_call
         
         # Get merchant's Google Calendar tokens (default merchant for now)
-        merchant_tokens = get_merchant_google_tokens("default")
+        merchant_tokens = await asyncio.to_thread(get_merchant_google_tokens, "default")
         
-        appointment_result = schedule_appointment_for_lead(
+        appointment_result = await run_calendar_call(
+            schedule_appointment_for_lead,
             name=st.get("name"),
             phone=st.get("phone"),
             location=st.get("location"),
@@ -772,9 +983,8 @@ def chat_endpoint(req: ChatRequest):
         st["appointment_scheduled"] = appointment_result.get('success', False)
         st["appointment_details"] = appointment_result.get('details', {})
         
-        st["turns"].append(("user", req.user_message))
-        st["turns"].append(("assistant", reply))
-        st["summary"] = summarise(st["summary"], req.user_message, reply)
+        record_turn(st, req.user_message, reply)
+        queue_summary_update(st, background_tasks, req.thread_id, req.user_message, reply)
         st["first_turn"] = False
         
         # Log bot response for conversation completion
@@ -816,9 +1026,8 @@ def chat_endpoint(req: ChatRequest):
             else:
                 reply = next_question
                 
-            st["turns"].append(("user", req.user_message))
-            st["turns"].append(("assistant", reply))
-            st["summary"] = summarise(st["summary"], req.user_message, reply)
+            record_turn(st, req.user_message, reply)
+            queue_summary_update(st, background_tasks, req.thread_id, req.user_message, reply)
             st["first_turn"] = False
             return ChatResponse(answer=reply, sources=[])
 
@@ -837,14 +1046,13 @@ def chat_endpoint(req: ChatRequest):
         }]
         
         try:
-            reply = call_chat(greeting_msg, temperature=0.3, max_tokens=80)
+            reply = await call_chat(greeting_msg, temperature=0.3, max_tokens=80)
             reply = postprocess(reply, first_turn=first_turn)
         except Exception:
             reply = f"Hi there, this is {req.name} here from {req.company}. How may I help you today?"
         
-        st["turns"].append(("user", req.user_message))
-        st["turns"].append(("assistant", reply))
-        st["summary"] = summarise(st["summary"], req.user_message, reply)
+        record_turn(st, req.user_message, reply)
+        queue_summary_update(st, background_tasks, req.thread_id, req.user_message, reply)
         st["first_turn"] = False
         
         # Log bot response for greeting
@@ -862,32 +1070,38 @@ def chat_endpoint(req: ChatRequest):
         
         return ChatResponse(answer=reply, sources=[])
 
+    # Retrieval for the raw message starts now, speculatively, while the theme
+    # URL is resolved off the event loop; theme turns return before using it
+    raw_hits_task = asyncio.create_task(asyncio.to_thread(retrieve_for_chat, req.user_message))
+
+    # 1) Detect style/feel intent and find theme URL (resolved once per turn)
+    theme_url = await asyncio.to_thread(resolve_theme_url, req.user_message) if "theme" in turn_tags else ""
+
     # Theme detection with contact handling
-    if mentions_theme(req.user_message):
-        url = resolve_theme_url(req.user_message)
-        if url:
+    if "theme" in turn_tags:
+        if theme_url:
 
             if need_contact(st):
-                reply = f"Sure, here's the project we did before {url}. May I have your name and phone number so I can follow up properly?"
+                reply = f"Sure, here's the project we did before {theme_url}. May I have your name and phone number so I can follow up properly?"
             else:
-                reply = f"Sure—here's one project that fits: {url}"
+                reply = f"Sure—here's one project that fits: {theme_url}"
         else:
             reply = "We definitely can do that, let's talk more when we meet. Can you provide me your name and phone number?"
 
-        st["turns"].append(("user", req.user_message))
-        st["turns"].append(("assistant", reply))
-        st["summary"] = summarise(st["summary"], req.user_message, reply)
+        record_turn(st, req.user_message, reply)
+        queue_summary_update(st, background_tasks, req.thread_id, req.user_message, reply)
         st["first_turn"] = False
         return ChatResponse(answer=reply, sources=[])
 
-    # 1) Detect style/feel intent and find theme URL
-    theme_url = ""
-    if mentions_theme(req.user_message):
-        theme_url = resolve_theme_url(req.user_message)
-
-    # Query rewrite -> retrieval -> context
-    rewritten = rewrite_query(st["summary"], req.user_message)
-    hits = retrieve_for_chat(rewritten)
+    # Query rewrite -> retrieval -> context. The raw message's hits are kept when
+    # the best of them is close enough; otherwise the rewrite is retrieved again.
+    rewritten, raw_hits = await asyncio.gather(
+        rewrite_query(st["summary"], req.user_message), raw_hits_task)
+    raw_distances = raw_hits["distances"][0]
+    if raw_distances and min(raw_distances) <= RAW_HITS_MAX_DISTANCE:
+        hits = raw_hits
+    else:
+        hits = await asyncio.to_thread(retrieve_for_chat, rewritten)
     top = rerank(rewritten, hits, topn=5)
     context = build_context(top)
 
@@ -912,25 +1126,70 @@ def chat_endpoint(req: ChatRequest):
         },
     ]
     # Add short history (last 2 turns)
-    for role, content in st["turns"][-4:]:
+    history = list(st["turns"])[-4:]
+    for role, content in history:
         messages.append({"role": role, "content": content})
     messages.append({"role": "user", "content": req.user_message})
 
+    cache_key = query_vec = cached = None
+    if SEMANTIC_CACHE_ENABLED:
+        # Key on everything in the prompt besides the query, so a reply written for
+        # one conversation (names, phone, project details) is never served to another
+        cache_key = SemanticCache.context_key(
+            theme_url, context, st['summary'][:2000],
+            *(f"{role}:{content}" for role, content in history))
+        query_vec = await asyncio.to_thread(SemanticCache.embed, rewritten)
+        if query_vec is not None:
+            cached = CHAT_REPLY_CACHE.check(cache_key, query_vec)
+
+    if cached:
+        reply = cached
+    elif req.stream:
+        return StreamingResponse(
+            stream_chat_reply(req, st, messages, top, cache_key, query_vec, background_tasks),
+            media_type="text/event-stream")
+    else:
+        try:
+            raw = await call_chat(messages, temperature=0.3, max_tokens=160)
+            reply = postprocess(raw, first_turn=False)
+            if query_vec is not None and raw != OAI_BUSY_REPLY:
+                CHAT_REPLY_CACHE.store(cache_key, query_vec, reply)
+        except Exception as e:
+            reply = "I'm having trouble responding right now. Could you please try again?"
+
+    return finish_chat_reply(req, st, reply, top, background_tasks)
+
+
+async def stream_chat_reply(req: ChatRequest, st: dict, messages, top, cache_key, query_vec,
+                            background_tasks: BackgroundTasks):
+    """Stream the LLM reply as SSE token events, then finish the turn and send the final answer."""
+    parts = []
     try:
-        raw = call_chat(messages, temperature=0.3, max_tokens=160)
+        async for delta in call_chat_stream(messages, temperature=0.3, max_tokens=160):
+            parts.append(delta)
+            yield sse_event({"token": delta})
+        raw = "".join(parts)
         reply = postprocess(raw, first_turn=False)
+        if query_vec is not None and raw != OAI_BUSY_REPLY:
+            CHAT_REPLY_CACHE.store(cache_key, query_vec, reply)
     except Exception as e:
         reply = "I'm having trouble responding right now. Could you please try again?"
 
+    # The streamed tokens are a preview; the done event carries the post-processed reply
+    response = finish_chat_reply(req, st, reply, top, background_tasks)
+    await asyncio.to_thread(CHAT_SESSIONS.save, req.thread_id, st)
+    yield sse_event(response.dict(), event="done")
+
+
+def finish_chat_reply(req: ChatRequest, st: dict, reply: str, top, background_tasks: BackgroundTasks) -> ChatResponse:
+    """Record a general-chat reply in the session and build the response."""
     # Auto-append portfolio for "why choose" intent
-    if re.search(r'\bwhy\b.*\bchoose\b', req.user_message,
-                 re.I) and req.portfolio_url and "Portfolio" not in reply:
+    if req.portfolio_url and "Portfolio" not in reply and asks_why_choose(req.user_message):
         reply = f"{reply} Portfolio: {req.portfolio_url}"
 
     # Update memory
-    st["turns"].append(("user", req.user_message))
-    st["turns"].append(("assistant", reply))
-    st["summary"] = summarise(st["summary"], req.user_message, reply)
+    record_turn(st, req.user_message, reply)
+    queue_summary_update(st, background_tasks, req.thread_id, req.user_message, reply)
     st["first_turn"] = False
 
     # Log bot response for general chat
@@ -953,12 +1212,16 @@ def chat_endpoint(req: ChatRequest):
     return ChatResponse(answer=reply, sources=sources[:3])
 
 
+# Chunks per embedding + Chroma upsert call when indexing a crawl
+CRAWL_UPSERT_BATCH_SIZE = CHROMA_UPSERT_BATCH_SIZE
+
+
 @app.post("/crawl", response_model=CrawlResponse)
 async def crawl(request: CrawlRequest):
     """Crawl a website and index its content."""
     try:
         # Crawl the website
-        client = FirecrawlClient()
+        client = get_firecrawl_client()
         pages_data = client.crawl_website(
             url=str(request.target_url),
             max_pages=request.max_pages,
@@ -970,39 +1233,31 @@ async def crawl(request: CrawlRequest):
                 detail="Failed to crawl any pages from the website")
 
         # Process and index the content
-        chunk_processor = TextChunker(chunk_size=1000, chunk_overlap=200)
         total_chunks = 0
+        pending = []
 
-        for page_data in pages_data:
+        async def flush():
+            nonlocal total_chunks
+            # Hand Chroma each page's chunks contiguously and in order
+            pending.sort(key=lambda c: (c["url"], c["chunk_idx"]))
             try:
-                # Process page content into chunks
-                chunks = chunk_processor.process_page_content(page_data)
-
-                if chunks:
-                    # Convert to the format expected by upsert_chunks
-                    chunk_data = []
-                    for i, chunk in enumerate(chunks):
-                        chunk_data.append({
-                            "text":
-                            chunk['content'],
-                            "url":
-                            chunk['metadata'].get('url', ''),
-                            "title":
-                            chunk['metadata'].get('title', 'Untitled'),
-                            "chunk_idx":
-                            i,
-                            "scraped_at":
-                            str(time.time())
-                        })
-
-                    # Index the chunks
-                    upsert_chunks(chunk_data)
-                    total_chunks += len(chunk_data)
+                await asyncio.to_thread(upsert_chunks, pending)
+                total_chunks += len(pending)
             except Exception as e:
-                print(
-                    f"Failed to index page {page_data.get('url', 'unknown')}: {str(e)}"
-                )
-                continue
+                print(f"Failed to index batch of {len(pending)} chunks: {str(e)}")
+            pending.clear()
+
+        # Chunk pages across CPU cores; embedding and upserts stay in this process
+        pages_chunks = await asyncio.to_thread(chunk_pages, pages_data)
+
+        for chunk_data in pages_chunks:
+            # Queue the chunks; embed and index them in large batches
+            pending.extend(chunk_data)
+            if len(pending) >= CRAWL_UPSERT_BATCH_SIZE:
+                await flush()
+
+        if pending:
+            await flush()
 
         return CrawlResponse(
             success=True,
@@ -1017,49 +1272,53 @@ async def crawl(request: CrawlRequest):
                             detail=f"Failed to crawl website: {str(e)}")
 
 
+# Metadata rows fetched per Chroma call when scanning the whole collection
+METADATA_PAGE_SIZE = 10_000
+
+
+def iter_chunk_metadatas(collection, page_size: int = METADATA_PAGE_SIZE):
+    """Yield every chunk's metadata, fetching page_size rows per collection.get call."""
+    offset = 0
+    while True:
+        page = collection.get(include=['metadatas'], limit=page_size, offset=offset)
+        metadatas = page['metadatas'] or []
+        yield from metadatas
+        if len(metadatas) < page_size:
+            return
+        offset += page_size
+
+
 @app.get("/crawled-pages")
 async def get_crawled_pages():
     """Get list of crawled pages with statistics."""
     try:
         from app.indexer import collection
 
-        # Get all documents with metadata
-        results = collection.get(include=['metadatas'])
-
-        if not results['metadatas']:
-            return []
-
-        # Group by URL and collect statistics
-        url_data = {}
-        for metadata in results['metadatas']:
+        # Group by URL and collect statistics in one pass, reading metadata a page
+        # at a time so peak memory is bounded by the page size, not the index
+        url_data = defaultdict(lambda: {'count': 0, 'title': None, 'last_crawled': 0.0})
+        for metadata in iter_chunk_metadatas(collection):
             url = metadata.get('url', 'Unknown')
-            if url != 'Unknown':
-                if url not in url_data:
-                    url_data[url] = {
-                        'count': 0,
-                        'title': metadata.get('title', 'Untitled'),
-                        'last_crawled': None
-                    }
-                url_data[url]['count'] += 1
-
-                # Get the latest scraped time
-                scraped_at = metadata.get('scraped_at')
-                if scraped_at:
-                    try:
-                        scraped_timestamp = float(scraped_at)
-                        if not url_data[url][
-                                'last_crawled'] or scraped_timestamp > url_data[
-                                    url]['last_crawled']:
-                            url_data[url]['last_crawled'] = scraped_timestamp
-                    except (ValueError, TypeError):
-                        pass
-
-        # Convert to response format
+            if url == 'Unknown':
+                continue
+            data = url_data[url]
+            data['count'] += 1
+            if data['title'] is None:
+                data['title'] = metadata.get('title', 'Untitled')
+
+            # Keep the latest scraped time ("unknown" is the indexer's placeholder)
+            scraped_at = metadata.get('scraped_at')
+            if scraped_at and scraped_at != 'unknown':
+                try:
+                    data['last_crawled'] = max(data['last_crawled'], float(scraped_at))
+                except (ValueError, TypeError):
+                    pass
+
+        # Convert to response format; timestamps are formatted once per URL
         crawled_pages = []
         for url, data in url_data.items():
             last_crawled = None
             if data['last_crawled']:
-                from datetime import datetime
                 last_crawled = datetime.fromtimestamp(
                     data['last_crawled']).strftime('%Y-%m-%d %H:%M:%S')
 
@@ -1070,7 +1329,8 @@ async def get_crawled_pages():
                 "last_crawled": last_crawled
             })
 
-        return crawled_pages
+        # Already plain JSON types: hand straight to the encoder, skipping jsonable_encoder
+        return FastJSONResponse(crawled_pages)
 
     except Exception as e:
         raise HTTPException(status_code=500,
@@ -7,12 +7,21 @@ from fastapi.responses import RedirectResponse, HTMLResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from datetime import datetime
-from app.calendar_integration import GoogleCalendarManager
-from app.database import save_merchant_google_tokens, get_merchant_google_tokens
+from app.calendar_integration import (
+    GoogleCalendarManager, schedule_appointment_for_lead, get_available_appointment_slots, run_calendar_call
+)
+from app.database import save_merchant_google_tokens, get_merchant_google_tokens, delete_merchant_google_tokens
+from string import Template
+import asyncio
+import html
 import os
 
 router = APIRouter()
 
+# Shared manager for the OAuth flow; it holds no per-merchant state.
+# Calendar operations still use a fresh manager, since authenticating binds its service.
+oauth_manager = GoogleCalendarManager()
+
 class AuthRequest(BaseModel):
     merchant_id: Optional[str] = "default"
     redirect_url: Optional[str] = None
@@ -43,8 +52,7 @@ class AppointmentResponse(BaseModel):
 async def google_signin(merchant_id: str = "default", redirect_url: str = None):
     """Initiate Google OAuth2 flow for calendar access."""
     try:
-        calendar_manager = GoogleCalendarManager()
-        auth_url = calendar_manager.get_auth_url(state=f"{merchant_id}|{redirect_url or ''}")
+        auth_url = oauth_manager.get_auth_url(state=f"{merchant_id}|{redirect_url or ''}")
         
         return {
             "auth_url": auth_url,
@@ -56,6 +64,34 @@ async def google_signin(merchant_id: str = "default", redirect_url: str = None):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate auth URL: {str(e)}")
 
+# Callback pages: the success page is static, so it is encoded once
+OAUTH_SUCCESS_HTML = """
+        <html>
+            <head><title>Calendar Connected</title></head>
+            <body style="font-family: Arial, sans-serif; text-align: center; padding: 50px;">
+                <h2 style="color: #4CAF50;">✅ Google Calendar Connected Successfully!</h2>
+                <p>Your calendar is now integrated and appointments will be automatically scheduled.</p>
+                <p>You can close this window and return to your dashboard.</p>
+                <script>
+                    setTimeout(() => {
+                        window.close();
+                    }, 3000);
+                </script>
+            </body>
+        </html>
+        """.encode("utf-8")
+
+OAUTH_ERROR_TEMPLATE = Template("""
+        <html>
+            <head><title>Connection Failed</title></head>
+            <body style="font-family: Arial, sans-serif; text-align: center; padding: 50px;">
+                <h2 style="color: #f44336;">❌ Calendar Connection Failed</h2>
+                <p>Error: ${error}</p>
+                <p>Please try again or contact support.</p>
+            </body>
+        </html>
+        """)
+
 @router.get("/oauth/callback")
 async def google_oauth_callback(code: str = Query(...), state: str = Query(None)):
     """Handle Google OAuth2 callback and save tokens."""
@@ -68,54 +104,31 @@ async def google_oauth_callback(code: str = Query(...), state: str = Query(None)
             merchant_id = parts[0]
             redirect_url = parts[1] if len(parts) > 1 and parts[1] else None
         
-        calendar_manager = GoogleCalendarManager()
-        tokens = calendar_manager.exchange_code_for_tokens(code)
+        tokens = await run_calendar_call(oauth_manager.exchange_code_for_tokens, code)
         
         # Save tokens to database
-        save_merchant_google_tokens(merchant_id, tokens)
+        await asyncio.to_thread(save_merchant_google_tokens, merchant_id, tokens)
         
         # Redirect to success page or specified URL
         if redirect_url:
             return RedirectResponse(url=redirect_url)
         
-        return HTMLResponse(content="""
-        <html>
-            <head><title>Calendar Connected</title></head>
-            <body style="font-family: Arial, sans-serif; text-align: center; padding: 50px;">
-                <h2 style="color: #4CAF50;">✅ Google Calendar Connected Successfully!</h2>
-                <p>Your calendar is now integrated and appointments will be automatically scheduled.</p>
-                <p>You can close this window and return to your dashboard.</p>
-                <script>
-                    setTimeout(() => {
-                        window.close();
-                    }, 3000);
-                </script>
-            </body>
-        </html>
-        """)
+        return Response(content=OAUTH_SUCCESS_HTML, media_type="text/html")
         
     except Exception as e:
-        return HTMLResponse(content=f"""
-        <html>
-            <head><title>Connection Failed</title></head>
-            <body style="font-family: Arial, sans-serif; text-align: center; padding: 50px;">
-                <h2 style="color: #f44336;">❌ Calendar Connection Failed</h2>
-                <p>Error: {str(e)}</p>
-                <p>Please try again or contact support.</p>
-            </body>
-        </html>
-        """, status_code=400)
+        return HTMLResponse(content=OAUTH_ERROR_TEMPLATE.substitute(error=html.escape(str(e))),
+                            status_code=400)
 
 @router.get("/available-slots")
 async def get_available_slots(merchant_id: str = "default", days_ahead: int = 7):
     """Get list of available appointment slots."""
     try:
-        tokens = get_merchant_google_tokens(merchant_id)
+        tokens = await asyncio.to_thread(get_merchant_google_tokens, merchant_id)
         if not tokens:
             raise HTTPException(status_code=401, detail="Calendar not connected. Please authenticate first.")
         
-        from app.calendar_integration import get_available_appointment_slots
-        slots = get_available_appointment_slots(tokens, days_ahead=days_ahead)
+        # Google API calls block, so run them off the event loop
+        slots = await run_calendar_call(get_available_appointment_slots, tokens, days_ahead=days_ahead)
         
         return [
             AppointmentSlot(
@@ -136,10 +149,10 @@ async def get_available_slots(merchant_id: str = "default", days_ahead: int = 7)
 async def schedule_appointment(request: AppointmentRequest):
     """Schedule a new appointment."""
     try:
-        tokens = get_merchant_google_tokens(request.merchant_id)
+        tokens = await asyncio.to_thread(get_merchant_google_tokens, request.merchant_id)
         
-        from app.calendar_integration import schedule_appointment_for_lead
-        result = schedule_appointment_for_lead(
+        result = await run_calendar_call(
+            schedule_appointment_for_lead,
             name=request.name,
             phone=request.phone,
             location=request.location,
@@ -161,7 +174,7 @@ async def schedule_appointment(request: AppointmentRequest):
 @router.get("/calendar-status")
 async def get_calendar_status(merchant_id: str = "default"):
     """Check if Google Calendar integration is working."""
-    tokens = get_merchant_google_tokens(merchant_id)
+    tokens = await asyncio.to_thread(get_merchant_google_tokens, merchant_id)
     
     if not tokens:
         return {
@@ -171,8 +184,7 @@ async def get_calendar_status(merchant_id: str = "default"):
         }
     
     # Test authentication
-    calendar_manager = GoogleCalendarManager()
-    is_authenticated = calendar_manager.authenticate_with_tokens(tokens)
+    is_authenticated = await run_calendar_call(GoogleCalendarManager.from_tokens, tokens) is not None
     
     return {
         "calendar_integration_active": is_authenticated,
@@ -184,8 +196,7 @@ async def get_calendar_status(merchant_id: str = "default"):
 async def disconnect_calendar(merchant_id: str = "default"):
     """Disconnect Google Calendar integration."""
     try:
-        from app.database import delete_merchant_google_tokens
-        delete_merchant_google_tokens(merchant_id)
+        await asyncio.to_thread(delete_merchant_google_tokens, merchant_id)
         
         return {
             "success": True,
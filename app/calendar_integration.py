@@ -3,10 +3,18 @@ Google Calendar integration for automated appointment scheduling.
 Handles OAuth2 authentication, availability checking, and appointment creation.
 """
 
+import asyncio
 import os
 import json
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
+from zoneinfo import ZoneInfo
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
 from google_auth_oauthlib.flow import Flow
@@ -17,36 +25,183 @@ from urllib.parse import urlencode
 # Google Calendar API scopes
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 
+# Appointments are booked and checked in the business's local time
+CALENDAR_TIMEZONE = 'Asia/Kuala_Lumpur'
+CALENDAR_TZ = ZoneInfo(CALENDAR_TIMEZONE)
+
 # OAuth2 credentials - these will be provided by the user
 GOOGLE_CLIENT_ID = os.getenv('GOOGLE_OAUTH_CLIENT_ID')
 GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_OAUTH_CLIENT_SECRET')
 
+# OAuth client settings shared by every flow; only the redirect URI varies
+CLIENT_CONFIG_WEB = {
+    "client_id": GOOGLE_CLIENT_ID,
+    "client_secret": GOOGLE_CLIENT_SECRET,
+    "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+    "token_uri": "https://oauth2.googleapis.com/token",
+}
+
+@lru_cache(maxsize=4)
+def _client_config(domain: str) -> Tuple[str, Dict[str, Any]]:
+    """Redirect URI and OAuth client config for a serving domain."""
+    redirect_uri = f'https://{domain}/api/appointments/oauth/callback'
+    return redirect_uri, {"web": {**CLIENT_CONFIG_WEB, "redirect_uris": [redirect_uri]}}
+
+# Authorized credentials per merchant token, so a refreshed access token is reused
+# instead of being refreshed again on every request.
+CREDENTIALS_CACHE_SIZE = 256
+_credentials_cache: "OrderedDict[str, Credentials]" = OrderedDict()
+_credentials_lock = threading.Lock()
+# When each cached credential was last handed out (time.monotonic())
+_credentials_last_used: Dict[str, float] = {}
+
+# Cached credentials are refreshed in the background this long before they
+# expire, so scheduling requests rarely wait on Google's token endpoint
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+TOKEN_REFRESH_INTERVAL_SECONDS = 60
+# Only credentials used this recently are kept fresh; idle merchants refresh on demand
+TOKEN_REFRESH_ACTIVE_SECONDS = 30 * 60
+_refresher_started = False
+
+# Built Calendar services per merchant token, kept per thread because their
+# httplib2 transport is not thread-safe. Blocking calls run on a reused worker
+# pool, so each worker keeps its connection open across requests.
+_thread_services = threading.local()
+
+# googleapiclient has no async transport, so async callers run calendar work on
+# this dedicated pool instead of the event loop's shared default executor. Its
+# long-lived threads also keep their thread-local services warm.
+CALENDAR_WORKERS = int(os.getenv('CALENDAR_WORKERS', '8'))
+_calendar_pool = ThreadPoolExecutor(max_workers=CALENDAR_WORKERS, thread_name_prefix='calendar')
+
+async def run_calendar_call(func, *args, **kwargs):
+    """Await a blocking calendar function on the calendar worker pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_calendar_pool, partial(func, *args, **kwargs))
+
+# Long-lived workers for listing days in parallel when a batch request fails,
+# so their thread-local services are reused across calls
+EVENTS_LIST_WORKERS = 8
+_events_pool = ThreadPoolExecutor(max_workers=EVENTS_LIST_WORKERS, thread_name_prefix='calendar-events')
+
+def _token_key(token_data: Dict[str, Any]) -> str:
+    return token_data.get('refresh_token') or token_data['access_token']
+
+def _refresh_expiring_credentials() -> None:
+    """Refresh recently used cached credentials that expire within the refresh margin."""
+    active_since = time.monotonic() - TOKEN_REFRESH_ACTIVE_SECONDS
+    with _credentials_lock:
+        cached = [credentials for key, credentials in _credentials_cache.items()
+                  if _credentials_last_used.get(key, 0) >= active_since]
+    # Credentials.expiry is a naive UTC datetime
+    cutoff = datetime.utcnow() + timedelta(seconds=TOKEN_REFRESH_MARGIN_SECONDS)
+    for credentials in cached:
+        if credentials.refresh_token and credentials.expiry and credentials.expiry < cutoff:
+            try:
+                credentials.refresh(Request())
+            except Exception as e:
+                print(f"Background token refresh failed: {e}")
+
+def _refresh_credentials_forever() -> None:
+    while True:
+        time.sleep(TOKEN_REFRESH_INTERVAL_SECONDS)
+        _refresh_expiring_credentials()
+
+def _start_token_refresher() -> None:
+    """Start the background refresh thread once, on first use of cached credentials."""
+    global _refresher_started
+    if _refresher_started:
+        return
+    _refresher_started = True
+    threading.Thread(target=_refresh_credentials_forever, name='calendar-token-refresh', daemon=True).start()
+
+def _cached_credentials(token_data: Dict[str, Any]) -> Credentials:
+    """Return shared Credentials for these tokens, creating them on first use."""
+    key = _token_key(token_data)
+    with _credentials_lock:
+        _start_token_refresher()
+        _credentials_last_used[key] = time.monotonic()
+        credentials = _credentials_cache.get(key)
+        if credentials is not None:
+            _credentials_cache.move_to_end(key)
+            return credentials
+        credentials = Credentials(
+            token=token_data['access_token'],
+            refresh_token=token_data.get('refresh_token'),
+            token_uri=token_data.get('token_uri'),
+            client_id=token_data.get('client_id'),
+            client_secret=token_data.get('client_secret'),
+            scopes=token_data.get('scopes')
+        )
+        _credentials_cache[key] = credentials
+        while len(_credentials_cache) > CREDENTIALS_CACHE_SIZE:
+            evicted, _ = _credentials_cache.popitem(last=False)
+            _credentials_last_used.pop(evicted, None)
+        return credentials
+
+def _cached_service(token_data: Dict[str, Any], credentials: Credentials):
+    """Return this thread's Calendar service for these tokens, building it on first use."""
+    services = getattr(_thread_services, 'services', None)
+    if services is None:
+        services = _thread_services.services = OrderedDict()
+    key = _token_key(token_data)
+    entry = services.get(key)
+    # Rebuild if the credentials were evicted and recreated for this token
+    if entry is not None and entry[0] is credentials:
+        services.move_to_end(key)
+        return entry[1]
+    try:
+        # Use the discovery document bundled with the client library (no network fetch)
+        service = build('calendar', 'v3', credentials=credentials,
+                        static_discovery=True, cache_discovery=False)
+    except TypeError:
+        # google-api-python-client < 2.0 has no static_discovery
+        service = build('calendar', 'v3', credentials=credentials, cache_discovery=False)
+    services[key] = (credentials, service)
+    while len(services) > CREDENTIALS_CACHE_SIZE:
+        services.popitem(last=False)
+    return service
+
+def _to_local(value: str) -> datetime:
+    """Parse a Calendar API date or RFC3339 time as a naive local datetime.
+
+    Slots are built and booked as naive local times, so busy intervals are
+    compared in the same form.
+    """
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        return parsed  # All-day events carry a bare date
+    return parsed.astimezone(CALENDAR_TZ).replace(tzinfo=None)
+
 class GoogleCalendarManager:
-    def __init__(self, user_credentials: Optional[str] = None):
-        self.service = None
+    def __init__(self, user_credentials: Optional[str] = None, service=None):
+        self.service = service
+        self._token_data: Optional[Dict[str, Any]] = None
         self.calendar_id = 'primary'  # Use primary calendar
         self.user_credentials = user_credentials
+    
+    @classmethod
+    def from_tokens(cls, token_data: Dict[str, Any]) -> Optional['GoogleCalendarManager']:
+        """Return a manager authenticated with a merchant's stored tokens, or None."""
+        manager = cls()
+        return manager if manager.authenticate_with_tokens(token_data) else None
         
-    def get_auth_url(self, state: str = None) -> str:
-        """Generate Google OAuth2 authorization URL for user to sign in."""
+    def _build_flow(self) -> Flow:
+        """Build the OAuth2 flow shared by sign-in and the callback."""
         if not GOOGLE_CLIENT_ID or not GOOGLE_CLIENT_SECRET:
             raise ValueError("Google OAuth credentials not configured")
             
         # Use the current domain from environment
-        domain = os.getenv('REPLIT_DEV_DOMAIN', 'localhost:5000')
-        redirect_uri = f'https://{domain}/api/appointments/oauth/callback'
+        redirect_uri, client_config = _client_config(os.getenv('REPLIT_DEV_DOMAIN', 'localhost:5000'))
         
-        flow = Flow.from_client_config({
-            "web": {
-                "client_id": GOOGLE_CLIENT_ID,
-                "client_secret": GOOGLE_CLIENT_SECRET,
-                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                "token_uri": "https://oauth2.googleapis.com/token",
-                "redirect_uris": [redirect_uri]
-            }
-        }, scopes=SCOPES)
+        flow = Flow.from_client_config(client_config, scopes=SCOPES)
         
         flow.redirect_uri = redirect_uri
+        return flow
+    
+    def get_auth_url(self, state: str = None) -> str:
+        """Generate Google OAuth2 authorization URL for user to sign in."""
+        flow = self._build_flow()
         
         auth_url, _ = flow.authorization_url(
             access_type='offline',
@@ -58,23 +213,7 @@ class GoogleCalendarManager:
     
     def exchange_code_for_tokens(self, code: str) -> Dict[str, Any]:
         """Exchange authorization code for access tokens."""
-        if not GOOGLE_CLIENT_ID or not GOOGLE_CLIENT_SECRET:
-            raise ValueError("Google OAuth credentials not configured")
-            
-        domain = os.getenv('REPLIT_DEV_DOMAIN', 'localhost:5000')
-        redirect_uri = f'https://{domain}/api/appointments/oauth/callback'
-        
-        flow = Flow.from_client_config({
-            "web": {
-                "client_id": GOOGLE_CLIENT_ID,
-                "client_secret": GOOGLE_CLIENT_SECRET,
-                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                "token_uri": "https://oauth2.googleapis.com/token",
-                "redirect_uris": [redirect_uri]
-            }
-        }, scopes=SCOPES)
-        
-        flow.redirect_uri = redirect_uri
+        flow = self._build_flow()
         flow.fetch_token(code=code)
         
         credentials = flow.credentials
@@ -90,20 +229,14 @@ class GoogleCalendarManager:
     def authenticate_with_tokens(self, token_data: Dict[str, Any]) -> bool:
         """Authenticate with stored user tokens."""
         try:
-            credentials = Credentials(
-                token=token_data['access_token'],
-                refresh_token=token_data.get('refresh_token'),
-                token_uri=token_data.get('token_uri'),
-                client_id=token_data.get('client_id'),
-                client_secret=token_data.get('client_secret'),
-                scopes=token_data.get('scopes')
-            )
+            credentials = _cached_credentials(token_data)
             
-            # Refresh token if expired
+            # Safety net: tokens are normally refreshed in the background before expiry
             if credentials.expired and credentials.refresh_token:
                 credentials.refresh(Request())
             
-            self.service = build('calendar', 'v3', credentials=credentials)
+            self.service = _cached_service(token_data, credentials)
+            self._token_data = token_data
             return True
             
         except Exception as e:
@@ -117,53 +250,57 @@ class GoogleCalendarManager:
         if not self.service:
             return []
             
+        # Slots and busy times are naive CALENDAR_TZ times, so "now" must be too
+        now = datetime.now(CALENDAR_TZ).replace(tzinfo=None)
         if not start_date:
-            start_date = datetime.now()
+            start_date = now
             
         # Define business hours (9 AM to 6 PM, Monday to Friday)
         business_start_hour = 9
         business_end_hour = 18
+        # Times below are whole seconds since midnight of the first day
+        slot_offsets = [hour * 3600 for hour in range(business_start_hour, business_end_hour - 1, 2)]
+        slot_length = 2 * 3600
+        second = timedelta(seconds=1)
         
         available_slots = []
         
         try:
+            # One freebusy query covers the whole window instead of an events.list per day
+            base = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+            # Busy intervals are converted once, rounding outwards to whole seconds
+            busy = sorted(((start - base) // second, -((base - end) // second))
+                          for start, end in self._get_busy_intervals(base, base + timedelta(days=days_ahead)))
+            now_s = (now - base) // second
+            # Busy starts in order, and the latest end among each prefix of them, so a
+            # slot conflicts iff some interval starting before it ends still runs into it
+            busy_starts = [start for start, _ in busy]
+            latest_ends = []
+            for _, end in busy:
+                latest_ends.append(max(end, latest_ends[-1]) if latest_ends else end)
+            
             for day_offset in range(days_ahead):
-                current_date = start_date + timedelta(days=day_offset)
+                current_date = base + timedelta(days=day_offset)
                 
                 # Skip weekends
                 if current_date.weekday() >= 5:  # Saturday = 5, Sunday = 6
                     continue
                 
-                # Get events for this day
-                day_start = current_date.replace(hour=0, minute=0, second=0, microsecond=0)
-                day_end = current_date.replace(hour=23, minute=59, second=59, microsecond=999999)
-                
-                events_result = self.service.events().list(
-                    calendarId=self.calendar_id,
-                    timeMin=day_start.isoformat() + 'Z',
-                    timeMax=day_end.isoformat() + 'Z',
-                    singleEvents=True,
-                    orderBy='startTime'
-                ).execute()
-                
-                events = events_result.get('items', [])
-                
                 # Find available slots (2-hour blocks)
-                for hour in range(business_start_hour, business_end_hour - 1, 2):
-                    slot_start = current_date.replace(hour=hour, minute=0, second=0, microsecond=0)
-                    slot_end = slot_start + timedelta(hours=2)
+                day_s = day_offset * 86400
+                for offset in slot_offsets:
+                    start_s = day_s + offset
+                    if start_s <= now_s:
+                        continue
+                    end_s = start_s + slot_length
                     
-                    # Check if slot conflicts with existing events
-                    is_available = True
-                    for event in events:
-                        event_start = datetime.fromisoformat(event['start'].get('dateTime', event['start'].get('date')))
-                        event_end = datetime.fromisoformat(event['end'].get('dateTime', event['end'].get('date')))
-                        
-                        if (slot_start < event_end and slot_end > event_start):
-                            is_available = False
-                            break
+                    # Check if slot conflicts with a busy interval
+                    i = bisect_left(busy_starts, end_s)
+                    is_available = i == 0 or latest_ends[i - 1] <= start_s
                     
-                    if is_available and slot_start > datetime.now():
+                    if is_available:
+                        slot_start = current_date + timedelta(seconds=offset)
+                        slot_end = slot_start + timedelta(seconds=slot_length)
                         available_slots.append({
                             'start_time': slot_start,
                             'end_time': slot_end,
@@ -177,6 +314,91 @@ class GoogleCalendarManager:
             
         return available_slots[:10]  # Return first 10 available slots
     
+    def _get_busy_intervals(self, time_min: datetime, time_max: datetime) -> List[Tuple[datetime, datetime]]:
+        """Busy (start, end) pairs between two local times, from a single freebusy query."""
+        result = self.service.freebusy().query(body={
+            'timeMin': time_min.replace(tzinfo=CALENDAR_TZ).isoformat(),
+            'timeMax': time_max.replace(tzinfo=CALENDAR_TZ).isoformat(),
+            'timeZone': CALENDAR_TIMEZONE,
+            'items': [{'id': self.calendar_id}]
+        }).execute()
+        
+        calendar = result.get('calendars', {}).get(self.calendar_id, {})
+        if calendar.get('errors'):
+            # freebusy reports per-calendar failures in the body rather than as an HttpError
+            print(f"Freebusy unavailable for {self.calendar_id}, listing events instead: {calendar['errors']}")
+            return self._get_busy_intervals_from_events(time_min, time_max)
+        
+        return [(_to_local(b['start']), _to_local(b['end'])) for b in calendar.get('busy', [])]
+    
+    def _get_busy_intervals_from_events(self, time_min: datetime, time_max: datetime) -> List[Tuple[datetime, datetime]]:
+        """Busy (start, end) pairs from the per-weekday events, fetched in one batch HTTP request."""
+        days: List[Tuple[datetime, datetime]] = []
+        day_start = time_min
+        while day_start < time_max:
+            day_end = min(day_start + timedelta(days=1), time_max)
+            if day_start.weekday() < 5:  # Slots are only offered on weekdays
+                days.append((day_start, day_end))
+            day_start = day_end
+        
+        events_by_day: Dict[str, List[Dict[str, Any]]] = {}
+        
+        def collect_events(request_id, response, exception):
+            if exception is not None:
+                print(f'An error occurred listing events for day {request_id}: {exception}')
+                return
+            events_by_day[request_id] = response.get('items', [])
+        
+        try:
+            batch = self.service.new_batch_http_request(callback=collect_events)
+            for day_start, day_end in days:
+                batch.add(self._events_list_request(self.service, day_start, day_end),
+                          request_id=day_start.strftime('%Y-%m-%d'))
+            batch.execute()
+        except Exception as e:
+            print(f"Batch events request failed, listing days in parallel: {e}")
+            events_by_day = self._list_events_parallel(days)
+        
+        busy = []
+        for events in events_by_day.values():
+            for event in events:
+                # Events marked "free" do not block a slot, as with freebusy
+                if event.get('transparency') == 'transparent':
+                    continue
+                busy.append((_to_local(event['start'].get('dateTime', event['start'].get('date'))),
+                             _to_local(event['end'].get('dateTime', event['end'].get('date')))))
+        return busy
+    
+    def _events_list_request(self, service, day_start: datetime, day_end: datetime):
+        """Build the events.list request for one local day."""
+        return service.events().list(
+            calendarId=self.calendar_id,
+            timeMin=day_start.replace(tzinfo=CALENDAR_TZ).isoformat(),
+            timeMax=day_end.replace(tzinfo=CALENDAR_TZ).isoformat(),
+            singleEvents=True,
+            orderBy='startTime'
+        )
+    
+    def _list_events_parallel(self, days: List[Tuple[datetime, datetime]]) -> Dict[str, List[Dict[str, Any]]]:
+        """List each day's events with one request per day, run concurrently."""
+        token_data = self._token_data
+        
+        def list_day(day: Tuple[datetime, datetime]) -> List[Dict[str, Any]]:
+            # Services are not thread-safe, so each worker uses its own
+            service = _cached_service(token_data, _cached_credentials(token_data)) if token_data else self.service
+            try:
+                return self._events_list_request(service, *day).execute().get('items', [])
+            except HttpError as error:
+                print(f'An error occurred listing events for day {day[0]:%Y-%m-%d}: {error}')
+                return []
+        
+        if token_data is None:
+            # An injected service cannot be rebuilt per thread, so list days one by one
+            results = map(list_day, days)
+        else:
+            results = _events_pool.map(list_day, days)
+        return {day_start.strftime('%Y-%m-%d'): items for (day_start, _), items in zip(days, results)}
+    
     def create_appointment(self, 
                           client_name: str,
                           client_phone: str,
@@ -207,11 +429,11 @@ This is an automated booking from the Jablanc Interior chat system.
                 '''.strip(),
                 'start': {
                     'dateTime': appointment_datetime.isoformat(),
-                    'timeZone': 'Asia/Kuala_Lumpur',
+                    'timeZone': CALENDAR_TIMEZONE,
                 },
                 'end': {
                     'dateTime': end_time.isoformat(),
-                    'timeZone': 'Asia/Kuala_Lumpur',
+                    'timeZone': CALENDAR_TIMEZONE,
                 },
                 'attendees': [
                     {'email': client_phone + '@placeholder.com', 'displayName': client_name},
@@ -263,10 +485,9 @@ def schedule_appointment_for_lead(name: str, phone: str, location: str, style: s
             'fallback_message': f"Hi {name}, thank you for providing all your details. We'll contact you at {phone} within 24 hours to schedule your consultation for your {style} project in {location}."
         }
     
-    calendar_manager = GoogleCalendarManager()
-    
     # Try to authenticate with merchant's tokens
-    if not calendar_manager.authenticate_with_tokens(merchant_tokens):
+    calendar_manager = GoogleCalendarManager.from_tokens(merchant_tokens)
+    if not calendar_manager:
         return {
             'success': False,
             'auth_required': True,
@@ -314,9 +535,8 @@ def schedule_appointment_for_lead(name: str, phone: str, location: str, style: s
 
 def get_available_appointment_slots(merchant_tokens: Dict[str, Any], days_ahead: int = 7) -> List[Dict[str, Any]]:
     """Get list of available appointment slots for user selection."""
-    calendar_manager = GoogleCalendarManager()
-    
-    if not calendar_manager.authenticate_with_tokens(merchant_tokens):
+    calendar_manager = GoogleCalendarManager.from_tokens(merchant_tokens)
+    if not calendar_manager:
         return []
     
     return calendar_manager.get_available_slots(days_ahead=days_ahead)
\ No newline at end of file
@@ -1,13 +1,97 @@
 """Text processing and chunking utilities."""
 
+import hashlib
+import multiprocessing
+import os
 import re
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from collections import ChainMap, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
 from bs4 import BeautifulSoup
 
+# Optional xxhash support (faster content hashing). If not installed, hashlib's blake2b is used.
+try:
+    import xxhash
+    HAS_XXHASH = True
+except Exception:
+    HAS_XXHASH = False
+
+# Optional selectolax support (fastest). If not installed, lxml or BeautifulSoup is used.
+try:
+    from selectolax.parser import HTMLParser as SelectolaxParser
+    HAS_SELECTOLAX = True
+except Exception:
+    HAS_SELECTOLAX = False
+
+# Optional lxml support (recommended). If not installed, BeautifulSoup's html.parser is used.
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+    HAS_LXML = True
+except Exception:
+    HAS_LXML = False
+
+
+# Chunk texts of recently processed pages, keyed by content digest and chunk settings
+PAGE_CHUNK_CACHE_SIZE = 1024
+_PAGE_CHUNK_CACHE: "OrderedDict[tuple, List[Tuple[str, int]]]" = OrderedDict()
+_page_chunk_lock = threading.Lock()
+
+
+def _content_digest(html_content: str, content: str) -> bytes:
+    """Digest of the page body a page's chunks are built from (HTML wins over text)."""
+    data = b'h' + html_content.encode('utf-8') if html_content else b't' + (content or '').encode('utf-8')
+    if HAS_XXHASH:
+        return xxhash.xxh128_digest(data)
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _cached_pieces(cache_key: tuple) -> Optional[List[Tuple[str, int]]]:
+    with _page_chunk_lock:
+        pieces = _PAGE_CHUNK_CACHE.get(cache_key)
+        if pieces is not None:
+            _PAGE_CHUNK_CACHE.move_to_end(cache_key)
+        return pieces
+
+
+def _store_pieces(cache_key: tuple, pieces: List[Tuple[str, int]]) -> None:
+    with _page_chunk_lock:
+        _PAGE_CHUNK_CACHE[cache_key] = pieces
+        while len(_PAGE_CHUNK_CACHE) > PAGE_CHUNK_CACHE_SIZE:
+            _PAGE_CHUNK_CACHE.popitem(last=False)
+
+
+class _CleanTextTable(dict):
+    """str.translate table keeping word characters, whitespace and basic punctuation.
+
+    Word characters are those `re` treats as \\w (alphanumerics and underscore).
+    Entries are filled in lazily the first time each code point is seen rather
+    than enumerating all of Unicode up front.
+    """
+
+    KEEP = frozenset('.!?,;:-()')
+
+    def __missing__(self, codepoint: int) -> Optional[int]:
+        ch = chr(codepoint)
+        value = codepoint if (ch.isalnum() or ch == '_' or ch.isspace() or ch in self.KEEP) else None
+        self[codepoint] = value
+        return value
+
+
+_CLEAN_TEXT_TABLE = _CleanTextTable()
+
 
 class TextChunker:
     """Handles text cleaning and chunking operations."""
     
+    _PUNCT_DEDUP_RE = re.compile(r'([.!?]){2,}')
+    _SENT_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+    
     def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
@@ -17,15 +101,35 @@ class TextChunker:
         if not html_content:
             return ""
         
-        # Parse HTML with BeautifulSoup
-        soup = BeautifulSoup(html_content, 'html.parser')
+        text = None
+        if HAS_SELECTOLAX:
+            try:
+                # C (Modest) parser; script and style elements are removed with their content
+                tree = SelectolaxParser(html_content)
+                tree.strip_tags(['script', 'style'])
+                text = tree.root.text(deep=True) if tree.root is not None else ""
+            except Exception:
+                text = None
         
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
+        if text is None and HAS_LXML:
+            try:
+                # C parser; script and style subtrees are dropped but their tails kept
+                root = lxml_html.document_fromstring(html_content)
+                etree.strip_elements(root, 'script', 'style', with_tail=False)
+                text = root.text_content()
+            except Exception:
+                text = None  # e.g. documents lxml rejects; retry with BeautifulSoup
         
-        # Get text and clean it
-        text = soup.get_text()
+        if text is None:
+            # Parse HTML with BeautifulSoup
+            soup = BeautifulSoup(html_content, 'html.parser')
+            
+            # Remove script and style elements
+            for script in soup(["script", "style"]):
+                script.decompose()
+            
+            # Get text and clean it
+            text = soup.get_text()
         
         # Clean up whitespace
         lines = (line.strip() for line in text.splitlines())
@@ -39,98 +143,109 @@ class TextChunker:
         if not text:
             return ""
         
-        # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove special characters but keep punctuation
-        text = re.sub(r'[^\w\s\.\!\?\,\;\:\-\(\)]', '', text)
+        # Remove excessive whitespace, then special characters but keep punctuation
+        text = ' '.join(text.split()).translate(_CLEAN_TEXT_TABLE)
         
         # Remove multiple consecutive punctuation
-        text = re.sub(r'([.!?]){2,}', r'\1', text)
+        text = self._PUNCT_DEDUP_RE.sub(r'\1', text)
         
         return text.strip()
     
     def chunk_text(self, text: str, metadata: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        """Split text into overlapping chunks."""
+        """Split text into overlapping chunks that share one copy of the page metadata."""
+        return self._attach_metadata(self._split_chunks(text), metadata)
+    
+    def _attach_metadata(self, pieces: List[Tuple[str, int]],
+                         metadata: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # One private copy of the page metadata, shared by every chunk's ChainMap
+        metadata = dict(metadata) if metadata else {}
+        return [{
+            'content': content,
+            'metadata': ChainMap({'chunk_index': i, 'chunk_length': length}, metadata)
+        } for i, (content, length) in enumerate(pieces)]
+    
+    def _split_chunks(self, text: str) -> List[Tuple[str, int]]:
+        """Split text into overlapping (content, chunk_length) pieces."""
         if not text:
             return []
         
-        if metadata is None:
-            metadata = {}
-        
         # Split text into sentences for better chunking
-        sentences = re.split(r'(?<=[.!?])\s+', text)
+        sentences = self._SENT_SPLIT_RE.split(text)
         
-        chunks = []
-        current_chunk = ""
-        current_length = 0
+        # Prefix sums of sentence lengths plus one separator each, so the joined
+        # length of sentences[i:k] is cum[k] - cum[i] - 1
+        n = len(sentences)
+        cum = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, sentences), dtype=np.int64, count=n) + 1, out=cum[1:])
         
-        for sentence in sentences:
-            sentence_length = len(sentence)
+        chunks = []
+        overlap_words = None  # Carried over from the previous chunk
+        i = 0
+        while i < n:
+            head = len(overlap_words) + 1 if overlap_words is not None else 0
+            if not head and not sentences[i]:
+                # An empty sentence is replaced by the next one rather than joined to it
+                i += 1
+                continue
             
-            # If adding this sentence would exceed chunk size
-            if current_length + sentence_length > self.chunk_size and current_chunk:
-                # Save current chunk
-                chunk_metadata = {
-                    **metadata,
-                    'chunk_index': len(chunks),
-                    'chunk_length': current_length
-                }
-                
-                chunks.append({
-                    'content': current_chunk.strip(),
-                    'metadata': chunk_metadata
-                })
-                
-                # Start new chunk with overlap
-                if self.chunk_overlap > 0:
-                    # Take last portion of current chunk for overlap
-                    overlap_text = current_chunk[-self.chunk_overlap:]
-                    # Find the start of the last complete word in overlap
-                    overlap_start = overlap_text.rfind(' ')
-                    if overlap_start != -1:
-                        current_chunk = overlap_text[overlap_start + 1:] + " " + sentence
-                    else:
-                        current_chunk = sentence
-                else:
-                    current_chunk = sentence
-                
-                current_length = len(current_chunk)
-            else:
-                # Add sentence to current chunk
-                if current_chunk:
-                    current_chunk += " " + sentence
-                else:
-                    current_chunk = sentence
-                current_length = len(current_chunk)
-        
-        # Add final chunk if it exists
-        if current_chunk.strip():
-            chunk_metadata = {
-                **metadata,
-                'chunk_index': len(chunks),
-                'chunk_length': len(current_chunk)
-            }
+            # Sentence k still fits while head + cum[k + 1] - cum[i] - 2 <= chunk_size;
+            # the first sentence of a chunk is always taken
+            limit = self.chunk_size + int(cum[i]) + 2 - head
+            end = max(i + 1, int(cum.searchsorted(limit, side='right')) - 1)
+            
+            parts = sentences[i:end]
+            if overlap_words is not None:
+                parts.insert(0, overlap_words)
+            current_chunk = " ".join(parts)
             
-            chunks.append({
-                'content': current_chunk.strip(),
-                'metadata': chunk_metadata
-            })
+            if end == n:
+                # Add final chunk if it exists
+                if current_chunk.strip():
+                    chunks.append((current_chunk.strip(), len(current_chunk)))
+                break
+            
+            # Save current chunk
+            chunks.append((current_chunk.strip(), len(current_chunk)))
+            
+            # Start new chunk with overlap
+            overlap_words = None
+            if self.chunk_overlap > 0:
+                # Take last portion of current chunk for overlap
+                overlap_text = current_chunk[-self.chunk_overlap:]
+                # Find the start of the last complete word in overlap
+                overlap_start = overlap_text.rfind(' ')
+                if overlap_start != -1:
+                    overlap_words = overlap_text[overlap_start + 1:]
+            i = end
         
         return chunks
     
-    def process_page_content(self, page_data: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Process a page and return chunks with metadata."""
-        content = page_data.get('content', '')
-        
-        # Clean HTML if present, otherwise clean text
+    def _page_cache_key(self, page_data: Dict[str, Any]) -> tuple:
+        # Re-crawled and duplicate pages reuse the chunk texts of identical content
+        digest = _content_digest(page_data.get('html', ''), page_data.get('content', ''))
+        return (digest, self.chunk_size, self.chunk_overlap)
+    
+    def _split_page(self, page_data: Dict[str, Any]) -> List[Tuple[str, int]]:
+        """Clean a page's HTML if present, otherwise its text, and split it into pieces."""
         html_content = page_data.get('html', '')
         if html_content:
             cleaned_content = self.clean_html(html_content)
         else:
-            cleaned_content = self.clean_text(content)
-        
-        if not cleaned_content:
+            cleaned_content = self.clean_text(page_data.get('content', ''))
+        return self._split_chunks(cleaned_content)
+    
+    def process_page_content(self, page_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Process a page and return chunks with metadata."""
+        cache_key = self._page_cache_key(page_data)
+        pieces = _cached_pieces(cache_key)
+        if pieces is None:
+            pieces = self._split_page(page_data)
+            _store_pieces(cache_key, pieces)
+        return self._page_chunks(page_data, pieces)
+    
+    def _page_chunks(self, page_data: Dict[str, Any],
+                     pieces: List[Tuple[str, int]]) -> List[Dict[str, Any]]:
+        if not pieces:
             return []
         
         # Prepare metadata - ensure URL is properly extracted  
@@ -152,4 +267,101 @@ class TextChunker:
         if 'metadata' in page_data:
             metadata.update(page_data['metadata'])
         
-        return self.chunk_text(cleaned_content, metadata)
+        return self._attach_metadata(pieces, metadata)
+    
+    def process_pages_batch(self, pages_data: List[Dict[str, Any]]) -> List[Optional[List[Dict[str, Any]]]]:
+        """Process many pages, in parallel processes for large batches; None marks a failed page."""
+        # The cache lives in this process: look it up here and send only the
+        # misses to the workers, then keep what they return
+        keys = [self._page_cache_key(page) for page in pages_data]
+        pieces_by_key = {}
+        misses = {}
+        for key, page in zip(keys, pages_data):
+            if key in pieces_by_key or key in misses:
+                continue
+            pieces = _cached_pieces(key)
+            if pieces is None:
+                misses[key] = page
+            else:
+                pieces_by_key[key] = pieces
+        
+        worker = partial(_split_page_or_none, self)
+        if len(misses) < PARALLEL_CHUNK_MIN_PAGES:
+            split = [worker(page) for page in misses.values()]
+        else:
+            split = _pool_map(worker, list(misses.values()))
+        for key, pieces in zip(misses, split):
+            pieces_by_key[key] = pieces
+            if pieces is not None:
+                _store_pieces(key, pieces)
+        
+        results = []
+        for key, page in zip(keys, pages_data):
+            pieces = pieces_by_key[key]
+            try:
+                results.append(None if pieces is None else self._page_chunks(page, pieces))
+            except Exception as e:
+                print(f"Failed to process page {page.get('url', 'unknown')}: {str(e)}")
+                results.append(None)
+        return results
+
+
+# Below this many pages, process start-up costs more than chunking serially
+PARALLEL_CHUNK_MIN_PAGES = 16
+
+# Worker processes are spawned, not forked: a fork of the threaded server can
+# inherit a lock (e.g. _page_chunk_lock) held by another thread and hang on it
+_chunk_pool: Optional[ProcessPoolExecutor] = None
+_chunk_pool_lock = threading.Lock()
+
+
+def _get_chunk_pool() -> ProcessPoolExecutor:
+    """Return the process pool shared by all crawls, starting it on first use."""
+    global _chunk_pool
+    with _chunk_pool_lock:
+        if _chunk_pool is None:
+            _chunk_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _chunk_pool
+
+
+def _pool_map(fn, items: List[Any]) -> List[Any]:
+    """Map fn over items in the shared pool; a broken pool is replaced on the next call."""
+    global _chunk_pool
+    pool = _get_chunk_pool()
+    try:
+        return list(pool.map(fn, items, chunksize=8))
+    except BrokenProcessPool:
+        with _chunk_pool_lock:
+            if _chunk_pool is pool:
+                _chunk_pool = None
+        raise
+
+
+def _split_page_or_none(chunker: TextChunker, page_data: Dict[str, Any]) -> Optional[List[Tuple[str, int]]]:
+    try:
+        return chunker._split_page(page_data)
+    except Exception as e:
+        print(f"Failed to process page {page_data.get('url', 'unknown')}: {str(e)}")
+        return None
+
+
+def chunk_records(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Convert one page's chunks to the format expected by upsert_chunks."""
+    # Chunks of one page share its scrape time
+    scraped_at = str(time.time())
+    return [{
+        "text": chunk['content'],
+        "url": chunk['metadata'].get('url', ''),
+        "title": chunk['metadata'].get('title', 'Untitled'),
+        "chunk_idx": i,
+        "scraped_at": scraped_at
+    } for i, chunk in enumerate(chunks)]
+
+
+def chunk_pages(pages_data: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Chunk crawled pages into upsert_chunks records; a failed page yields []."""
+    page_chunks = TextChunker(chunk_size=1000, chunk_overlap=200).process_pages_batch(pages_data)
+    return [chunk_records(chunks) if chunks else [] for chunks in page_chunks]
@@ -1,22 +1,23 @@
 """Configuration management for the RAG system."""
 
-import os
 from typing import Optional
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
     
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+    
     # API Configuration
     api_host: str = "0.0.0.0"
     api_port: int = 5000
     
     # Firecrawl Configuration
-    firecrawl_api_key: str = os.getenv("FIRECRAWL_API_KEY", "")
+    firecrawl_api_key: str = ""
     
     # OpenAI Configuration (for embeddings fallback)
-    openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
+    openai_api_key: str = ""
     
     # Chroma Configuration
     chroma_db_path: str = "./data/chroma"
@@ -34,17 +35,32 @@ class Settings(BaseSettings):
     similarity_threshold: float = 0.7
     
     # Target website to crawl
-    target_website: str = os.getenv("TARGET_WEBSITE", "")
-    
-    class Config:
-        env_file = ".env"
+    target_website: str = ""
+
+
+# Global settings instance, created on first access (PEP 562 module __getattr__)
+_settings: Optional[Settings] = None
+
+# Legacy constants for backward compatibility, mapped to their settings fields
+_LEGACY_CONSTANTS = {
+    "FIRECRAWL_API_KEY": "firecrawl_api_key",
+    "OPENAI_API_KEY": "openai_api_key",
+    "CHROMA_DIR": "chroma_db_path",
+    "COLLECTION_NAME": "chroma_collection_name",
+}
+
 
+def get_settings() -> Settings:
+    """Return the global settings, loading them from the environment on first call."""
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
 
-# Global settings instance
-settings = Settings()
 
-# Legacy constants for backward compatibility
-FIRECRAWL_API_KEY = settings.firecrawl_api_key
-OPENAI_API_KEY = settings.openai_api_key
-CHROMA_DIR = settings.chroma_db_path
-COLLECTION_NAME = settings.chroma_collection_name
+def __getattr__(name: str):
+    if name == "settings":
+        return get_settings()
+    if name in _LEGACY_CONSTANTS:
+        return getattr(get_settings(), _LEGACY_CONSTANTS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
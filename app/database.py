@@ -1,26 +1,92 @@
 # app/database.py
 import psycopg2
+from psycopg2.extras import Json
+from psycopg2.pool import ThreadedConnectionPool
 import os
+import threading
+from collections import OrderedDict
 from contextlib import contextmanager
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, List, Optional, Any
 import json
+import time
 
-def get_db_connection():
-    """Get database connection using environment variables."""
-    return psycopg2.connect(
-        host=os.getenv('PGHOST'),
-        port=os.getenv('PGPORT'),
-        database=os.getenv('PGDATABASE'),
-        user=os.getenv('PGUSER'),
-        password=os.getenv('PGPASSWORD')
-    )
+# Optional orjson support for faster JSONB encoding. If not installed, stdlib json is used.
+try:
+    import orjson
+    HAS_ORJSON = True
+except Exception:
+    HAS_ORJSON = False
+
+# Connections are reused from a pool instead of opened per query
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '16'))
+_pool: Optional[ThreadedConnectionPool] = None
+_pool_lock = threading.Lock()
+# ThreadedConnectionPool raises when exhausted, so callers wait for a free slot here instead
+_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+
+class OJson(Json):
+    """JSONB parameter adapter that serializes with orjson when it is installed."""
+
+    def dumps(self, obj):
+        if HAS_ORJSON:
+            try:
+                return orjson.dumps(obj).decode()
+            except TypeError:
+                # e.g. non-string dict keys, which stdlib json coerces
+                pass
+        return json.dumps(obj)
+
+class _PreparingConnection(psycopg2.extensions.connection):
+    """Connection that remembers which server-side prepared statements it holds."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+def _get_pool() -> ThreadedConnectionPool:
+    """Create the connection pool on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(
+                    1, DB_POOL_MAX,
+                    host=os.getenv('PGHOST'),
+                    port=os.getenv('PGPORT'),
+                    database=os.getenv('PGDATABASE'),
+                    user=os.getenv('PGUSER'),
+                    password=os.getenv('PGPASSWORD'),
+                    connection_factory=_PreparingConnection
+                )
+    return _pool
 
 @contextmanager
-def get_db_cursor():
-    """Context manager for database operations."""
-    conn = get_db_connection()
+def _pooled_connection():
+    """Check out a pooled database connection, returning it to the pool afterwards."""
+    pool = _get_pool()
+    _pool_slots.acquire()
+    try:
+        conn = pool.getconn()
+    except Exception:
+        _pool_slots.release()
+        raise
+    try:
+        yield conn
+    finally:
+        # Never hand back a connection mid-transaction; drop ones the server closed
+        if not conn.closed:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                pass
+        pool.putconn(conn, close=bool(conn.closed))
+        _pool_slots.release()
+
+@contextmanager
+def _transaction(conn):
+    """Cursor whose work is committed on success and rolled back on error."""
+    cursor = conn.cursor()
     try:
-        cursor = conn.cursor()
         yield cursor
         conn.commit()
     except Exception as e:
@@ -28,59 +94,147 @@ def get_db_cursor():
         raise e
     finally:
         cursor.close()
-        conn.close()
+
+@contextmanager
+def get_db_connection():
+    """Check out a pooled database connection, creating the schema on first use."""
+    ensure_schema()
+    with _pooled_connection() as conn:
+        yield conn
+
+@contextmanager
+def get_db_cursor():
+    """Context manager for database operations."""
+    with get_db_connection() as conn:
+        with _transaction(conn) as cursor:
+            yield cursor
+
+# Hot upserts, prepared once per pooled connection so each call skips parse and plan
+PREPARED_STATEMENTS = {
+    'save_consumer_data_stmt': ('(integer, varchar, jsonb, varchar)', """
+        INSERT INTO consumer_data (merchant_id, thread_id, collected_data, status)
+        VALUES ($1, $2, $3, $4)
+        ON CONFLICT (thread_id) DO UPDATE SET
+            collected_data = EXCLUDED.collected_data,
+            status = EXCLUDED.status,
+            updated_at = NOW()
+    """),
+    'update_conversation_session_stmt': ('(varchar, integer, integer, jsonb, varchar)', """
+        INSERT INTO conversation_sessions (thread_id, merchant_id, current_field, collected_data, status)
+        VALUES ($1, $2, $3, $4, $5)
+        ON CONFLICT (thread_id) DO UPDATE SET
+            current_field = EXCLUDED.current_field,
+            collected_data = EXCLUDED.collected_data,
+            status = EXCLUDED.status,
+            updated_at = NOW()
+    """),
+    'save_conversation_session_stmt': ('(varchar, integer, integer, jsonb, varchar)', """
+        INSERT INTO conversation_sessions (thread_id, merchant_id, current_field, collected_data, status)
+        VALUES ($1, $2, $3, $4, $5)
+        ON CONFLICT (thread_id) DO UPDATE SET
+            merchant_id = EXCLUDED.merchant_id,
+            current_field = EXCLUDED.current_field,
+            collected_data = EXCLUDED.collected_data,
+            status = EXCLUDED.status,
+            updated_at = NOW()
+    """),
+    'save_merchant_google_tokens_stmt': ('(varchar, jsonb)', """
+        INSERT INTO merchant_google_tokens (merchant_id, tokens)
+        VALUES ($1, $2)
+        ON CONFLICT (merchant_id)
+        DO UPDATE SET tokens = EXCLUDED.tokens, updated_at = NOW()
+    """),
+}
+
+def _execute_prepared(cursor, name: str, params: tuple):
+    """Execute a statement from PREPARED_STATEMENTS, preparing it on this connection first if needed."""
+    conn = cursor.connection
+    if name not in conn.prepared:
+        arg_types, sql = PREPARED_STATEMENTS[name]
+        cursor.execute(f"PREPARE {name} {arg_types} AS {sql}")
+        # Prepared statements live for the session and survive transaction rollback
+        conn.prepared.add(name)
+    cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+
+# All merchant tables, created in a single round-trip
+MERCHANT_SCHEMA_SQL = """
+    -- Merchants table - stores merchant configuration
+    CREATE TABLE IF NOT EXISTS merchants (
+        id SERIAL PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        company VARCHAR(255) NOT NULL,
+        fields_config JSONB NOT NULL,
+        conversation_tone TEXT DEFAULT 'professional',
+        created_at TIMESTAMP DEFAULT NOW(),
+        updated_at TIMESTAMP DEFAULT NOW()
+    );
+    -- Company lookup used when seeding the default merchant
+    CREATE INDEX IF NOT EXISTS merchants_company_idx ON merchants (company);
+    
+    -- Consumer data table - stores collected information
+    CREATE TABLE IF NOT EXISTS consumer_data (
+        id SERIAL PRIMARY KEY,
+        merchant_id INTEGER REFERENCES merchants(id),
+        thread_id VARCHAR(255) NOT NULL,
+        collected_data JSONB NOT NULL,
+        status VARCHAR(50) DEFAULT 'incomplete',
+        created_at TIMESTAMP DEFAULT NOW(),
+        updated_at TIMESTAMP DEFAULT NOW()
+    );
+    -- One row per thread, the conflict target of the consumer data upsert. Until the
+    -- index exists, older duplicate rows per thread are dropped (keeping the newest)
+    -- so existing data cannot make its creation fail and abort the schema setup.
+    DO $$
+    BEGIN
+        IF to_regclass('consumer_data_thread_uniq') IS NULL THEN
+            DELETE FROM consumer_data WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (
+                        PARTITION BY thread_id
+                        ORDER BY updated_at DESC NULLS LAST, created_at DESC NULLS LAST, id DESC
+                    ) AS rn
+                    FROM consumer_data
+                ) ranked
+                WHERE rn > 1
+            );
+        END IF;
+    END $$;
+    CREATE UNIQUE INDEX IF NOT EXISTS consumer_data_thread_uniq ON consumer_data (thread_id);
+    -- Lets lead listings read newest first without a sort
+    CREATE INDEX IF NOT EXISTS consumer_data_created_idx ON consumer_data (created_at DESC);
+    
+    -- Conversation sessions table
+    CREATE TABLE IF NOT EXISTS conversation_sessions (
+        thread_id VARCHAR(255) PRIMARY KEY,
+        merchant_id INTEGER REFERENCES merchants(id),
+        current_field INTEGER DEFAULT 0,
+        collected_data JSONB DEFAULT '{}',
+        status VARCHAR(50) DEFAULT 'active',
+        created_at TIMESTAMP DEFAULT NOW(),
+        updated_at TIMESTAMP DEFAULT NOW()
+    );
+    
+    -- Google tokens table for calendar integration
+    CREATE TABLE IF NOT EXISTS merchant_google_tokens (
+        merchant_id VARCHAR(255) PRIMARY KEY,
+        tokens JSONB NOT NULL,
+        created_at TIMESTAMP DEFAULT NOW(),
+        updated_at TIMESTAMP DEFAULT NOW()
+    );
+"""
+
+# Advisory lock key serialising schema setup across processes, so workers starting
+# together cannot both pass the default merchant's NOT EXISTS check
+SCHEMA_LOCK_KEY = 0x6A61626C
 
 def init_merchant_tables():
-    """Initialize merchant configuration and consumer data tables."""
-    with get_db_cursor() as cursor:
-        # Merchants table - stores merchant configuration
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS merchants (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                company VARCHAR(255) NOT NULL,
-                fields_config JSONB NOT NULL,
-                conversation_tone TEXT DEFAULT 'professional',
-                created_at TIMESTAMP DEFAULT NOW(),
-                updated_at TIMESTAMP DEFAULT NOW()
-            )
-        """)
-        
-        # Consumer data table - stores collected information
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS consumer_data (
-                id SERIAL PRIMARY KEY,
-                merchant_id INTEGER REFERENCES merchants(id),
-                thread_id VARCHAR(255) NOT NULL,
-                collected_data JSONB NOT NULL,
-                status VARCHAR(50) DEFAULT 'incomplete',
-                created_at TIMESTAMP DEFAULT NOW(),
-                updated_at TIMESTAMP DEFAULT NOW()
-            )
-        """)
-        
-        # Conversation sessions table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS conversation_sessions (
-                thread_id VARCHAR(255) PRIMARY KEY,
-                merchant_id INTEGER REFERENCES merchants(id),
-                current_field INTEGER DEFAULT 0,
-                collected_data JSONB DEFAULT '{}',
-                status VARCHAR(50) DEFAULT 'active',
-                created_at TIMESTAMP DEFAULT NOW(),
-                updated_at TIMESTAMP DEFAULT NOW()
-            )
-        """)
-        
-        # Google tokens table for calendar integration
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS merchant_google_tokens (
-                merchant_id VARCHAR(255) PRIMARY KEY,
-                tokens JSONB NOT NULL,
-                created_at TIMESTAMP DEFAULT NOW(),
-                updated_at TIMESTAMP DEFAULT NOW()
-            )
-        """)
+    """Create the merchant tables and seed the default merchant in one transaction."""
+    with _pooled_connection() as conn:
+        with _transaction(conn) as cursor:
+            # Released when the transaction commits or rolls back
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", (SCHEMA_LOCK_KEY,))
+            cursor.execute(MERCHANT_SCHEMA_SQL)
+            _seed_default_merchant(cursor)
 
 def create_merchant(name: str, company: str, fields_config: List[Dict], tone: str = 'professional') -> int:
     """Create a new merchant with custom field configuration."""
@@ -88,7 +242,7 @@ def create_merchant(name: str, company: str, fields_config: List[Dict], tone: st
         cursor.execute("""
             INSERT INTO merchants (name, company, fields_config, conversation_tone)
             VALUES (%s, %s, %s, %s) RETURNING id
-        """, (name, company, json.dumps(fields_config), tone))
+        """, (name, company, OJson(fields_config), tone))
         
         return cursor.fetchone()[0]
 
@@ -114,14 +268,8 @@ def get_merchant_config(merchant_id: int) -> Optional[Dict]:
 def save_consumer_data(merchant_id: int, thread_id: str, data: Dict, status: str = 'incomplete'):
     """Save or update consumer data."""
     with get_db_cursor() as cursor:
-        cursor.execute("""
-            INSERT INTO consumer_data (merchant_id, thread_id, collected_data, status)
-            VALUES (%s, %s, %s, %s)
-            ON CONFLICT (thread_id) DO UPDATE SET
-                collected_data = EXCLUDED.collected_data,
-                status = EXCLUDED.status,
-                updated_at = NOW()
-        """, (merchant_id, thread_id, json.dumps(data), status))
+        _execute_prepared(cursor, 'save_consumer_data_stmt',
+                          (merchant_id, thread_id, OJson(data), status))
 
 def get_conversation_session(thread_id: str) -> Optional[Dict]:
     """Get conversation session data."""
@@ -146,75 +294,76 @@ def update_conversation_session(thread_id: str, merchant_id: int, current_field:
                               collected_data: Dict, status: str = 'active'):
     """Update conversation session."""
     with get_db_cursor() as cursor:
-        cursor.execute("""
-            INSERT INTO conversation_sessions (thread_id, merchant_id, current_field, collected_data, status)
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT (thread_id) DO UPDATE SET
-                current_field = EXCLUDED.current_field,
-                collected_data = EXCLUDED.collected_data,
-                status = EXCLUDED.status,
-                updated_at = NOW()
-        """, (thread_id, merchant_id, current_field, json.dumps(collected_data), status))
+        _execute_prepared(cursor, 'update_conversation_session_stmt',
+                          (thread_id, merchant_id, current_field, OJson(collected_data), status))
 
 def save_conversation_session(thread_id: str, merchant_id: int, current_field: int, collected_data: Dict, status: str):
     """Save or update conversation session."""
     with get_db_cursor() as cursor:
-        cursor.execute("""
-            INSERT INTO conversation_sessions (thread_id, merchant_id, current_field, collected_data, status)
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT (thread_id) DO UPDATE SET
-                merchant_id = EXCLUDED.merchant_id,
-                current_field = EXCLUDED.current_field,
-                collected_data = EXCLUDED.collected_data,
-                status = EXCLUDED.status,
-                updated_at = NOW()
-        """, (thread_id, merchant_id, current_field, json.dumps(collected_data), status))
+        _execute_prepared(cursor, 'save_conversation_session_stmt',
+                          (thread_id, merchant_id, current_field, OJson(collected_data), status))
 
 # Legacy functions for backward compatibility
-def save_lead(name: str, phone: str, thread_id: str, location: str = "", style_preference: str = ""):
+def save_lead(name: str, phone: str, thread_id: str, location: str = "", style_preference: str = "",
+              theme_interest: str = ""):
     """Legacy function for backward compatibility."""
     # Default to Jablanc Interior (merchant_id = 1) if not specified
     data = {
         'name': name,
         'phone': phone,
         'location': location,
-        'style_preference': style_preference
+        'style_preference': style_preference,
+        'theme_interest': theme_interest
     }
     save_consumer_data(1, thread_id, data, 'complete')
 
+# Merchant tokens change only on (re)connect or disconnect, so reads are cached briefly
+GOOGLE_TOKENS_TTL_SECONDS = 60
+# Merchants whose tokens are kept; least recently read are evicted first
+GOOGLE_TOKENS_CACHE_SIZE = 256
+_google_tokens_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_google_tokens_lock = threading.Lock()
+
+def clear_google_tokens_cache(merchant_id: str):
+    """Drop a merchant's cached tokens so the next read goes to the database."""
+    with _google_tokens_lock:
+        _google_tokens_cache.pop(merchant_id, None)
+
 def save_merchant_google_tokens(merchant_id: str, tokens: dict):
     """Save Google OAuth tokens for a merchant."""
-    from datetime import datetime
     with get_db_cursor() as cursor:
-        cursor.execute("""
-            INSERT INTO merchant_google_tokens (merchant_id, tokens, created_at, updated_at)
-            VALUES (%s, %s, %s, %s)
-            ON CONFLICT (merchant_id) 
-            DO UPDATE SET tokens = %s, updated_at = %s
-        """, (
-            merchant_id, 
-            json.dumps(tokens), 
-            datetime.now(), 
-            datetime.now(),
-            json.dumps(tokens), 
-            datetime.now()
-        ))
+        _execute_prepared(cursor, 'save_merchant_google_tokens_stmt', (merchant_id, OJson(tokens)))
         print(f"✅ SAVED GOOGLE TOKENS for merchant: {merchant_id}")
+    clear_google_tokens_cache(merchant_id)
 
 def get_merchant_google_tokens(merchant_id: str) -> Optional[dict]:
-    """Get Google OAuth tokens for a merchant."""
+    """Get Google OAuth tokens for a merchant, cached for GOOGLE_TOKENS_TTL_SECONDS."""
+    now = time.monotonic()
+    with _google_tokens_lock:
+        cached = _google_tokens_cache.get(merchant_id)
+        if cached and now - cached[1] < GOOGLE_TOKENS_TTL_SECONDS:
+            _google_tokens_cache.move_to_end(merchant_id)
+            return dict(cached[0])
     with get_db_cursor() as cursor:
         cursor.execute("SELECT tokens FROM merchant_google_tokens WHERE merchant_id = %s", (merchant_id,))
         result = cursor.fetchone()
-        if result:
-            return json.loads(result[0])
+        tokens = json.loads(result[0]) if result else None
+    if not tokens:
+        # Misses are not cached: merchant_id comes from the caller
         return None
+    with _google_tokens_lock:
+        _google_tokens_cache[merchant_id] = (tokens, now)
+        _google_tokens_cache.move_to_end(merchant_id)
+        while len(_google_tokens_cache) > GOOGLE_TOKENS_CACHE_SIZE:
+            _google_tokens_cache.popitem(last=False)
+    return dict(tokens)
 
 def delete_merchant_google_tokens(merchant_id: str):
     """Delete Google OAuth tokens for a merchant."""
     with get_db_cursor() as cursor:
         cursor.execute("DELETE FROM merchant_google_tokens WHERE merchant_id = %s", (merchant_id,))
         print(f"✅ DELETED GOOGLE TOKENS for merchant: {merchant_id}")
+    clear_google_tokens_cache(merchant_id)
 
 def get_lead(thread_id: str) -> Optional[Dict]:
     """Legacy function for backward compatibility."""
@@ -228,30 +377,51 @@ def get_lead(thread_id: str) -> Optional[Dict]:
             return row[0] if isinstance(row[0], dict) else json.loads(row[0])
         return None
 
-def get_all_leads() -> List[Dict]:
-    """Legacy function for backward compatibility."""
-    with get_db_cursor() as cursor:
-        cursor.execute("""
-            SELECT thread_id, collected_data, created_at 
-            FROM consumer_data ORDER BY created_at DESC
-        """)
-        leads = []
-        for row in cursor.fetchall():
-            data = row[1] if isinstance(row[1], dict) else json.loads(row[1])
-            data['thread_id'] = row[0]
-            data['created_at'] = row[2].isoformat()
-            leads.append(data)
-        return leads
-
-# Initialize tables on import
-try:
-    init_merchant_tables()
-    # Create default Jablanc Interior merchant if not exists
-    with get_db_cursor() as cursor:
-        cursor.execute("SELECT id FROM merchants WHERE company = 'Jablanc Interior' LIMIT 1")
-        if not cursor.fetchone():
-            from app.merchant_config import MERCHANT_TEMPLATES
-            fields_config = [field.to_dict() for field in MERCHANT_TEMPLATES['interior_design']]
-            create_merchant("Mei Yee", "Jablanc Interior", fields_config, "professional")
-except Exception as e:
-    print(f"Error initializing merchant tables: {e}")
\ No newline at end of file
+LEADS_STREAM_ITERSIZE = 500
+
+def get_all_leads() -> Iterator[Dict]:
+    """Stream all leads, newest first, through a server-side cursor."""
+    with get_db_connection() as conn:
+        # collected_data is JSONB, which psycopg2 already decodes to a dict
+        with conn.cursor(name='leads_stream') as cursor:
+            cursor.itersize = LEADS_STREAM_ITERSIZE
+            cursor.execute("""
+                SELECT thread_id, collected_data, created_at 
+                FROM consumer_data ORDER BY created_at DESC
+            """)
+            for thread_id, data, created_at in cursor:
+                data['thread_id'] = thread_id
+                data['created_at'] = created_at.isoformat()
+                yield data
+
+def _seed_default_merchant(cursor):
+    """Create the default Jablanc Interior merchant if it does not exist."""
+    from app.merchant_config import MERCHANT_TEMPLATES
+    fields_config = [field.to_dict() for field in MERCHANT_TEMPLATES['interior_design']]
+    cursor.execute("""
+        INSERT INTO merchants (name, company, fields_config, conversation_tone)
+        SELECT %s, %s, %s, %s
+        WHERE NOT EXISTS (SELECT 1 FROM merchants WHERE company = %s)
+    """, ("Mei Yee", "Jablanc Interior", OJson(fields_config), "professional", "Jablanc Interior"))
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def ensure_schema():
+    """Create the tables and default merchant once per process.
+
+    Called from the app's startup hook and by the first get_db_connection(), so
+    scripts and workers importing this module get the schema too; a failed
+    attempt is retried on the next call.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        try:
+            init_merchant_tables()
+            _schema_ready = True
+        except Exception as e:
+            print(f"Error initializing merchant tables: {e}")
\ No newline at end of file
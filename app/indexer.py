@@ -2,30 +2,181 @@
 
 import os
 import hashlib
+import sqlite3
+import threading
 import requests
-import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 import chromadb
 from chromadb.config import Settings as ChromaSettings
 from app.config import OPENAI_API_KEY, CHROMA_DIR, COLLECTION_NAME
-from app.chunking import TextChunker
+from app.chunking import TextChunker, chunk_records
+
+# Optional orjson support for faster decoding of embedding responses. If not installed, stdlib json is used.
+try:
+    import orjson
+    HAS_ORJSON = True
+except Exception:
+    HAS_ORJSON = False
 
 # Chroma persistent client
 client = chromadb.PersistentClient(path=CHROMA_DIR)
 collection = client.get_or_create_collection(name=COLLECTION_NAME)
 
-def embed_texts(texts: List[str]) -> List[List[float]]:
-    """Generate embeddings using OpenAI's text-embedding-3-large model."""
-    r = requests.post(
+# Rate limits and transient server errors during indexing are retried with
+# exponential backoff (1s, 2s, 4s, ...; Retry-After is honoured). Embedding
+# requests are idempotent, so POST is retried too.
+EMBED_RETRY = Retry(
+    total=5,
+    backoff_factor=1,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset({"POST"}),
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+
+# Shared session so embedding calls reuse kept-alive TLS connections to OpenAI
+_embed_session = requests.Session()
+_embed_session.headers.update({"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"})
+_embed_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=EMBED_RETRY))
+
+# Query embeddings sit on a chat turn, so they get one short retry and
+# otherwise fail fast instead of waiting out the indexing backoff
+QUERY_EMBED_RETRY = Retry(
+    total=1,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset({"POST"}),
+    respect_retry_after_header=False,
+    raise_on_status=False,
+)
+
+_query_embed_session = requests.Session()
+_query_embed_session.headers.update({"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"})
+_query_embed_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=QUERY_EMBED_RETRY))
+
+# Bumped whenever the main collection changes, so answer caches built on search results can expire
+_index_version = 0
+
+def index_version() -> int:
+    """Return a counter that changes each time the main collection is written in this process."""
+    return _index_version
+
+def _bump_index_version():
+    global _index_version
+    _index_version += 1
+
+EMBED_MODEL = "text-embedding-3-large"
+
+def _post_embeddings(session: requests.Session, texts: List[str]) -> List[List[float]]:
+    r = session.post(
         "https://api.openai.com/v1/embeddings",
-        headers={"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"},
-        json={"model": "text-embedding-3-large", "input": texts},
+        json={"model": EMBED_MODEL, "input": texts},
         timeout=120
     )
     r.raise_for_status()
-    data = r.json()
+    # Each response carries thousands of floats per input, so parsing speed matters
+    data = orjson.loads(r.content) if HAS_ORJSON else r.json()
     return [d["embedding"] for d in data["data"]]
 
+def embed_texts(texts: List[str]) -> List[List[float]]:
+    """Generate embeddings using OpenAI's text-embedding-3-large model."""
+    return _post_embeddings(_embed_session, texts)
+
+def embed_queries(texts: List[str]) -> List[List[float]]:
+    """Embed search queries on the chat path, with at most one short retry."""
+    return _post_embeddings(_query_embed_session, texts)
+
+# Inputs per embeddings request: amortises the round-trip while keeping each
+# request far below OpenAI's per-request input and token limits
+EMBED_BATCH_SIZE = 256
+# Embedding requests in flight at once; each waits mostly on the network
+EMBED_CONCURRENCY = 8
+_embed_pool = ThreadPoolExecutor(max_workers=EMBED_CONCURRENCY, thread_name_prefix="embed")
+
+def embed_texts_batched(texts: List[str], batch_size: int = EMBED_BATCH_SIZE) -> List[List[float]]:
+    """Embed any number of texts, `batch_size` inputs per OpenAI request, requests run concurrently."""
+    if len(texts) <= batch_size:
+        return embed_texts(texts) if texts else []
+    # Group similar-length texts into the same request (smart batching); the
+    # result is put back in input order, so callers never see the reordering
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    ordered = [texts[i] for i in order]
+    batches = [ordered[i:i + batch_size] for i in range(0, len(ordered), batch_size)]
+    embeddings: List[Optional[List[float]]] = [None] * len(texts)
+    position = 0
+    # map() yields in submission order, matching `order`
+    for batch_embeddings in _embed_pool.map(embed_texts, batches):
+        for embedding in batch_embeddings:
+            embeddings[order[position]] = embedding
+            position += 1
+    return embeddings
+
+# Rows per Chroma upsert: large enough to amortise each call's overhead and
+# HNSW insertion, small enough to keep individual writes short
+CHROMA_UPSERT_BATCH_SIZE = 500
+
+# Embeddings of previously indexed texts, kept next to the Chroma data so
+# re-indexing unchanged pages only pays for the chunks that changed
+EMBED_CACHE_PATH = os.path.join(CHROMA_DIR, "emb_cache.db")
+# Hashes per SELECT, below SQLite's bound-parameter limit
+EMBED_CACHE_LOOKUP_BATCH = 500
+_embed_cache_conn: Optional[sqlite3.Connection] = None
+_embed_cache_lock = threading.Lock()
+
+def _embed_cache() -> sqlite3.Connection:
+    """Open the embedding cache on first use (callers hold _embed_cache_lock)."""
+    global _embed_cache_conn
+    if _embed_cache_conn is None:
+        os.makedirs(CHROMA_DIR, exist_ok=True)
+        conn = sqlite3.connect(EMBED_CACHE_PATH, check_same_thread=False)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+        """)
+        _embed_cache_conn = conn
+    return _embed_cache_conn
+
+def embed_texts_cached(texts: List[str]) -> List[List[float]]:
+    """Embed texts, reusing vectors cached on disk by (model, sha256(text))."""
+    hashes = [hashlib.sha256(t.encode()).hexdigest() for t in texts]
+    found: Dict[str, List[float]] = {}
+    try:
+        with _embed_cache_lock:
+            conn = _embed_cache()
+            for i in range(0, len(hashes), EMBED_CACHE_LOOKUP_BATCH):
+                part = hashes[i:i + EMBED_CACHE_LOOKUP_BATCH]
+                rows = conn.execute(
+                    f"SELECT text_hash, embedding FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(part))})",
+                    (EMBED_MODEL, *part))
+                for text_hash, blob in rows:
+                    found[text_hash] = array('d', blob).tolist()
+    except sqlite3.Error as e:
+        print(f"Error reading embedding cache: {e}")
+
+    misses = [i for i, h in enumerate(hashes) if h not in found]
+    if misses:
+        fresh = embed_texts_batched([texts[i] for i in misses])
+        rows = []
+        for i, embedding in zip(misses, fresh):
+            found[hashes[i]] = embedding
+            rows.append((EMBED_MODEL, hashes[i], array('d', embedding).tobytes()))
+        try:
+            with _embed_cache_lock:
+                conn = _embed_cache()
+                conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error writing embedding cache: {e}")
+    return [found[h] for h in hashes]
+
 def upsert_chunks(chunks: List[Dict]):
     """Upsert chunks into ChromaDB with OpenAI embeddings."""
     if not chunks:
@@ -55,8 +206,14 @@ def upsert_chunks(chunks: List[Dict]):
     if not valid_chunks:
         return
     
+    # Chroma rejects duplicate ids within one upsert, so keep the last copy of each chunk
+    by_id = {
+        hashlib.sha256(f'{c["url"]}-{c["chunk_idx"]}-{c["text"]}'.encode()).hexdigest(): c
+        for c in valid_chunks
+    }
+    ids = list(by_id)
+    valid_chunks = list(by_id.values())
     texts = [c["text"] for c in valid_chunks]
-    ids = [hashlib.sha256(f'{c["url"]}-{c["chunk_idx"]}-{c["text"]}'.encode()).hexdigest() for c in valid_chunks]
     
     # Create clean metadata - ensure all values are strings, ints, floats, or bools
     metas = []
@@ -69,8 +226,15 @@ def upsert_chunks(chunks: List[Dict]):
         }
         metas.append(meta)
 
-    embeddings = embed_texts(texts)
-    collection.upsert(ids=ids, embeddings=embeddings, metadatas=metas, documents=texts)
+    # Crawled pages repeat boilerplate (headers, footers, nav), so each distinct text is embedded once
+    unique_index: Dict[str, int] = {}
+    positions = [unique_index.setdefault(t, len(unique_index)) for t in texts]
+    unique_embeddings = embed_texts_cached(list(unique_index))
+    embeddings = [unique_embeddings[i] for i in positions]
+    for i in range(0, len(ids), CHROMA_UPSERT_BATCH_SIZE):
+        j = i + CHROMA_UPSERT_BATCH_SIZE
+        collection.upsert(ids=ids[i:j], embeddings=embeddings[i:j], metadatas=metas[i:j], documents=texts[i:j])
+    _bump_index_version()
 
 
 class ContentIndexer:
@@ -99,47 +263,64 @@ class ContentIndexer:
         """Index content from a single page using OpenAI embeddings."""
         try:
             # Process page content into chunks
-            chunks = self.chunk_processor.process_page_content(page_data)
-            
-            if not chunks:
-                return {"chunks_processed": 0, "chunks_indexed": 0}
-            
-            # Convert to the format expected by upsert_chunks
-            chunk_data = []
-            for i, chunk in enumerate(chunks):
-                chunk_data.append({
-                    "text": chunk['content'],
-                    "url": chunk['metadata'].get('url', ''),
-                    "title": chunk['metadata'].get('title', 'Untitled'),
-                    "chunk_idx": i,
-                    "scraped_at": str(time.time())
-                })
-            
-            # Use the new OpenAI-based upsert function
-            upsert_chunks(chunk_data)
-            
-            return {
-                "chunks_processed": len(chunks),
-                "chunks_indexed": len(chunks)
-            }
+            return self._index_chunks(self.chunk_processor.process_page_content(page_data))
             
         except Exception as e:
             raise Exception(f"Failed to index page content: {str(e)}")
     
+    def _index_chunks(self, chunks: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Embed and store the chunks of one page."""
+        if not chunks:
+            return {"chunks_processed": 0, "chunks_indexed": 0}
+        
+        # Use the new OpenAI-based upsert function
+        upsert_chunks(chunk_records(chunks))
+        
+        return {
+            "chunks_processed": len(chunks),
+            "chunks_indexed": len(chunks)
+        }
+    
     def index_multiple_pages(self, pages_data: List[Dict[str, Any]]) -> Dict[str, int]:
         """Index content from multiple pages."""
         total_processed = 0
         total_indexed = 0
         failed_pages = 0
         
-        for page_data in pages_data:
+        # Chunking is CPU-bound, so large batches are split across processes first
+        page_chunks = self.chunk_processor.process_pages_batch(pages_data)
+        
+        # Chunks from several pages are buffered into upserts of at most
+        # CHROMA_UPSERT_BATCH_SIZE rows, sharing their embedding requests;
+        # a failed group counts all of its pages as failed
+        group_pages: List[Dict[str, Any]] = []
+        group_records: List[Dict[str, Any]] = []
+        
+        def flush_group():
+            nonlocal total_processed, total_indexed, failed_pages
+            if not group_pages:
+                return
             try:
-                result = self.index_page_content(page_data)
-                total_processed += result["chunks_processed"]
-                total_indexed += result["chunks_indexed"]
+                upsert_chunks(group_records)
+                total_processed += len(group_records)
+                total_indexed += len(group_records)
             except Exception as e:
+                failed_pages += len(group_pages)
+                for page_data in group_pages:
+                    print(f"Failed to index page {page_data.get('url', 'unknown')}: {str(e)}")
+            group_pages.clear()
+            group_records.clear()
+        
+        for page_data, chunks in zip(pages_data, page_chunks):
+            if chunks is None:
                 failed_pages += 1
-                print(f"Failed to index page {page_data.get('url', 'unknown')}: {str(e)}")
+                continue
+            records = chunk_records(chunks)
+            if len(group_records) + len(records) > CHROMA_UPSERT_BATCH_SIZE:
+                flush_group()
+            group_pages.append(page_data)
+            group_records.extend(records)
+        flush_group()
         
         return {
             "pages_total": len(pages_data),
@@ -156,7 +337,7 @@ class ContentIndexer:
             return {
                 "total_documents": count,
                 "collection_name": COLLECTION_NAME,
-                "embedding_model": "text-embedding-3-large"
+                "embedding_model": EMBED_MODEL
             }
         except Exception as e:
             raise Exception(f"Failed to get collection stats: {str(e)}")
@@ -170,6 +351,7 @@ class ContentIndexer:
                 name=COLLECTION_NAME,
                 metadata={"description": "Website content for RAG system"}
             )
+            _bump_index_version()
             return True
         except Exception as e:
             print(f"Failed to clear collection: {str(e)}")
@@ -179,7 +361,7 @@ class ContentIndexer:
         """Search for similar content in the collection using OpenAI embeddings."""
         try:
             # Generate embedding for the query using OpenAI
-            query_embedding = embed_texts([query])[0]
+            query_embedding = embed_queries([query])[0]
             
             # Search in Chroma using the embedding
             results = self.collection.query(
@@ -188,21 +370,15 @@ class ContentIndexer:
                 include=['documents', 'metadatas', 'distances']
             )
             
-            # Process results
-            similar_content = []
-            if results['documents'] and results['documents'][0]:
-                for i in range(len(results['documents'][0])):
-                    distance = results['distances'][0][i]
-                    # For cosine distance, similarity = 1 - distance
-                    similarity = max(0, 1 - distance)
-                    
-                    similar_content.append({
-                        'content': results['documents'][0][i],
-                        'metadata': results['metadatas'][0][i],
-                        'similarity_score': similarity
-                    })
-            
-            return similar_content
+            # Process results; Chroma already returns them nearest first
+            if not results['documents'] or not results['documents'][0]:
+                return []
+            # For cosine distance, similarity = 1 - distance
+            return [
+                {'content': document, 'metadata': metadata, 'similarity_score': max(0, 1 - distance)}
+                for document, metadata, distance in zip(
+                    results['documents'][0], results['metadatas'][0], results['distances'][0])
+            ]
             
         except Exception as e:
             raise Exception(f"Failed to search similar content: {str(e)}")
@@ -214,7 +390,7 @@ class ContentIndexer:
             return {
                 "status": "healthy",
                 "total_documents": count,
-                "embedding_model": "text-embedding-3-large"
+                "embedding_model": EMBED_MODEL
             }
         except Exception as e:
             return {
@@ -4,9 +4,12 @@ Manages detection of user intents like portfolio requests, generic ID queries, a
 """
 
 import re
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, Set
 from enum import Enum, auto
-from app.retriever import search
+from app.retriever import search, search_batch
+from utils.keyword_scan import KeywordScanner
+from utils.regex_compat import compile_pattern
 
 
 class Intent(Enum):
@@ -34,7 +37,7 @@ OFFICE_ADDRESS_TRIGGERS = ("where are you located", "office address",
                            "your address", "your location",
                            "where is your office", "office location",
                            "address", "where you based",
-                           "where can I find you", "your office", "location",
+                           "where can i find you", "your office", "location",
                            "where are you")
 
 # Services-specific triggers
@@ -48,64 +51,99 @@ PRICING_TRIGGERS = ("price", "cost", "how much", "pricing", "budget",
                    "what does it cost", "how much does", "what's the cost")
 
 GENERIC_ID_PATTERN = r"\b(id|interior design|renovation|makeover|concept)\b"
-
-
+GENERIC_ID_RE = compile_pattern(GENERIC_ID_PATTERN, ignore_case=True)
+# Single-word alternatives of GENERIC_ID_PATTERN, matched as whole words by set lookup
+GENERIC_ID_WORDS = frozenset({"id", "renovation", "makeover", "concept"})
+WORD_RE = re.compile(r"\w+")
+FEE_RE = compile_pattern(r"\bfee\b")
+# Bare greetings and acknowledgements; none of them contains an intent trigger
+SMALL_TALK_REPLIES = frozenset({"hi", "hello", "hey", "ok", "okay", "yes", "no", "sure",
+                                "thanks", "thank you", "ty", "noted", "alright"})
+
+# Slot-filling turns shorter than this are answers like "ok" or "yes", not
+# side-questions worth a RAG lookup
+MIN_RAG_QUERY_WORDS = 3
+
+# Single-pass keyword tagging for a whole turn
+TURN_KEYWORDS = KeywordScanner({
+    "info": INFO_TRIGGERS,
+})
+
+
+def scan_turn_keywords(text: str) -> Set[str]:
+    """Tag which trigger groups occur in the turn; computed once per turn."""
+    return TURN_KEYWORDS.scan((text or "").lower().strip())
+
+
+def is_small_talk(text: str) -> bool:
+    """True for a bare greeting or acknowledgement, which carries no intent."""
+    return (text or "").strip().lower().rstrip("!.?") in SMALL_TALK_REPLIES
+
+
+# Words marking a short reply as a style preference rather than a question
+STYLE_INDICATORS = ('cozy', 'modern', 'minimalist', 'contemporary', 'traditional',
+                    'scandinavian', 'industrial', 'rustic', 'elegant', 'luxury',
+                    'vintage', 'classic', 'warm', 'cool', 'bright', 'feel', 'vibe',
+                    'aesthetic', 'look', 'theme', 'style')
+EXPLICIT_PRICE_WORDS = ('how much', 'cost', 'price', 'expensive', 'cheap', 'rate', 'fee', 'charge')
+
+# Every trigger group detect_intent checks, matched in a single pass;
+# " fee " is left to FEE_RE since it must match as a whole word
+INTENT_KEYWORDS = KeywordScanner({
+    "office": OFFICE_ADDRESS_TRIGGERS,
+    "pricing": (t for t in PRICING_TRIGGERS if t.strip() != "fee"),
+    "services": SERVICES_TRIGGERS,
+    "portfolio": PORTFOLIO_TRIGGERS,
+    "info": INFO_TRIGGERS,
+    "style": STYLE_INDICATORS,
+    "explicit_price": EXPLICIT_PRICE_WORDS,
+})
+
+
+# Several is_*_intent helpers run per turn on the same text; they share one cached detection
+INTENT_CACHE_SIZE = 1024
+
+@lru_cache(maxsize=INTENT_CACHE_SIZE)
 def detect_intent(text: str) -> Intent:
     """Detect the primary intent from user message."""
     if not text:
         return Intent.NONE
 
     text_lower = text.lower().strip()
-    
-    # Check if this is likely a style preference response (not a question)
-    style_indicators = ['cozy', 'modern', 'minimalist', 'contemporary', 'traditional', 
-                       'scandinavian', 'industrial', 'rustic', 'elegant', 'luxury', 
-                       'vintage', 'classic', 'warm', 'cool', 'bright', 'feel', 'vibe', 
-                       'aesthetic', 'look', 'theme', 'style']
+    # One pass over the text finds every trigger group that occurs
+    tags = INTENT_KEYWORDS.scan(text_lower)
     
     # If it's a short response with style indicators and no explicit pricing words, 
     # don't classify as pricing intent
     is_style_response = (len(text_lower.split()) <= 5 and 
-                        any(indicator in text_lower for indicator in style_indicators) and
-                        not any(explicit_price in text_lower for explicit_price in 
-                               ['how much', 'cost', 'price', 'expensive', 'cheap', 'rate', 'fee', 'charge']))
+                        "style" in tags and "explicit_price" not in tags)
 
     # Office address intent has highest priority for location queries
-    if any(trigger in text_lower for trigger in OFFICE_ADDRESS_TRIGGERS):
+    if "office" in tags:
         return Intent.OFFICE_ADDRESS
 
     # Pricing intent has high priority to handle pricing questions specifically
-    # But exclude style responses and use more precise matching
-    if not is_style_response:
-        # Check for explicit pricing questions with word boundaries
-        pricing_match = False
-        for trigger in PRICING_TRIGGERS:
-            if trigger.strip() == "fee":
-                # Special case for "fee" - check if it's a standalone word
-                if re.search(r'\bfee\b', text_lower):
-                    pricing_match = True
-                    break
-            elif trigger in text_lower:
-                pricing_match = True
-                break
-        
-        if pricing_match:
-            return Intent.PRICING
+    # But exclude style responses; "fee" only counts as a standalone word
+    if not is_style_response and ("pricing" in tags or FEE_RE.search(text_lower)):
+        return Intent.PRICING
         
     # Services intent to provide services information
-    if any(trigger in text_lower for trigger in SERVICES_TRIGGERS):
+    if "services" in tags:
         return Intent.SERVICES
 
     # Portfolio intent has high priority
-    if any(trigger in text_lower for trigger in PORTFOLIO_TRIGGERS):
+    if "portfolio" in tags:
         return Intent.PORTFOLIO
 
-    # Generic interior design intent
-    if re.search(GENERIC_ID_PATTERN, text, re.I):
+    # Generic interior design intent: whole-word lookup, with the regex only
+    # confirming the two-word "interior design" phrase
+    words = set(WORD_RE.findall(text_lower))
+    if not words.isdisjoint(GENERIC_ID_WORDS) or (
+            "interior" in words and "design" in words and GENERIC_ID_RE.search(text)):
         return Intent.GENERIC_ID
 
     # Information request intent (but exclude style responses)
-    if not is_style_response and any(trigger in text_lower for trigger in INFO_TRIGGERS):
+    if not is_style_response and "info" in tags:
         return Intent.INFO_REQUEST
 
     return Intent.NONE
@@ -144,18 +182,17 @@ def handle_portfolio_intent(
         portfolio_url = "https://jablancinteriors.com/projects/"
         print(f"DEBUG: Using default portfolio URL: {portfolio_url}")
     
+    parts = [f"Yes sure, you may look at our portfolio here {portfolio_url}."]
     preview = portfolio_preview()
-    head = f"Yes sure, you may look at our portfolio here {portfolio_url}."
-    body = f"\n{preview}" if preview else ""
+    if preview:
+        parts.append(preview)
 
     # Generate intelligent follow-up based on missing information and context
     follow_up = get_intelligent_portfolio_followup(text, state)
-    
-    response = (head + body).strip()
     if follow_up:
-        response += f"\n{follow_up}"
+        parts.append(follow_up)
 
-    return response
+    return "\n".join(parts)
 
 
 def get_intelligent_portfolio_followup(user_text: str, state) -> Optional[str]:
@@ -231,8 +268,9 @@ def get_intelligent_portfolio_followup(user_text: str, state) -> Optional[str]:
     return None
 
 
+@lru_cache(maxsize=None)
 def portfolio_preview(max_items: int = 3) -> Optional[str]:
-    """Show 1–3 project examples from portfolio."""
+    """Show 1–3 project examples from portfolio (static, so built once per max_items)."""
     # Return static portfolio examples pointing to the correct portfolio URL
     portfolio_examples = [
         "Modern Minimalist Design (https://jablancinteriors.com/projects/)",
@@ -245,10 +283,27 @@ def portfolio_preview(max_items: int = 3) -> Optional[str]:
     return "Examples: " + "; ".join(selected_examples)
 
 
+def truncate_at_word(text: str, max_chars: int) -> str:
+    """Cut text at the last space within max_chars and append an ellipsis."""
+    cut = text.rfind(" ", 0, max_chars)
+    return (text[:cut] if cut >= 0 else text[:max_chars]) + "..."
+
+
 def rag_answer_one_liner(user_text: str,
                          max_chars: int = 220,
-                         state=None) -> Optional[str]:
-    """Answer side-questions briefly using RAG (1 sentence + 1 source)."""
+                         state=None,
+                         tags: Optional[Set[str]] = None) -> Optional[str]:
+    """Answer side-questions briefly using RAG (1 sentence + 1 source).
+    
+    Pass the turn's `tags` from scan_turn_keywords to skip intent detection and
+    the embedding + vector search when the turn asks nothing. Short
+    acknowledgements are only skipped on that path; a caller that already
+    classified the turn as an info request gets an answer however short it is.
+    """
+    if tags is not None:
+        if "info" not in tags or len(user_text.split()) < MIN_RAG_QUERY_WORDS:
+            return None
+
     if not is_info_request_intent(user_text):
         return None
 
@@ -264,7 +319,7 @@ def rag_answer_one_liner(user_text: str,
     url = h["meta"].get("url", "")
     snippet = (h["text"] or "").strip()
     if len(snippet) > max_chars:
-        snippet = snippet[:max_chars].rsplit(" ", 1)[0] + "..."
+        snippet = truncate_at_word(snippet, max_chars)
 
     return f"{snippet} (Source: {url})"
 
@@ -277,8 +332,8 @@ def get_office_address_from_rag(user_text: str) -> Optional[str]:
         "office location address contact information"
     ]
 
-    for query in address_queries:
-        hits = search(query, top_k=3) or []
+    # Issue all address queries as one batched embedding + Chroma round-trip
+    for hits in search_batch(address_queries, top_k=3):
         for hit in hits:
             content = (hit["text"] or "").lower()
             url = hit["meta"].get("url", "")
@@ -290,7 +345,7 @@ def get_office_address_from_rag(user_text: str) -> Optional[str]:
             ]):
                 snippet = (hit["text"] or "").strip()
                 if len(snippet) > 300:
-                    snippet = snippet[:300].rsplit(" ", 1)[0] + "..."
+                    snippet = truncate_at_word(snippet, 300)
                 return f"{snippet} (Source: {url})"
 
     return None
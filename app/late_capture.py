@@ -1,12 +1,21 @@
 # app/late_capture.py
 import re
+from functools import lru_cache
 from typing import Dict, Optional
 from utils.lead import extract_name, extract_phone
 from utils.location import extract_location
 from utils.theme import mentions_theme, resolve_theme_url
 
+# Short replies ("yes", "ok", "portfolio please") repeat across threads
+PARSE_ALL_CACHE_SIZE = 1024
+
 def parse_all(user_text: str) -> Dict[str, Optional[str]]:
     """Extract any fields from the message even if not asked right now."""
+    # Copy so callers can't alter the cached result
+    return dict(_parse_all_cached(user_text))
+
+@lru_cache(maxsize=PARSE_ALL_CACHE_SIZE)
+def _parse_all_cached(user_text: str) -> Dict[str, Optional[str]]:
     try:
         name, name_score = extract_name(user_text)  # Returns tuple now
     except (ValueError, TypeError):
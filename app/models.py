@@ -32,6 +32,7 @@ class AskRequest(BaseModel):
     question: str = Field(..., min_length=1, max_length=1000, description="Question to ask")
     top_k: Optional[int] = Field(default=5, ge=1, le=20, description="Maximum number of results to return")
     tone_type: Optional[str] = Field(default="customer_support", description="Response tone type (customer_support, technical, casual)")
+    stream: bool = Field(default=False, description="Stream the answer as server-sent events")
 
 
 class SourceDocument(BaseModel):
@@ -55,6 +56,7 @@ class ChatRequest(BaseModel):
     name: str = Field(default="Mei Yee", description="Business owner name")
     company: str = Field(default="Jablanc Interior", description="Company name")
     portfolio_url: str = Field(default="", description="Portfolio URL (optional)")
+    stream: bool = Field(default=False, description="Stream the reply as server-sent events")
 
 
 class ChatResponse(BaseModel):
@@ -5,6 +5,9 @@ from app.rag_assist import maybe_rag_line
 from app.late_capture import parse_all
 from app.database import get_merchant_config, save_consumer_data, get_conversation_session, save_conversation_session
 
+# Fields late capture may fill in whenever the user mentions them
+LATE_FIELDS = ("name", "phone", "style", "location")
+
 # Global session storage - in production, use Redis or database
 SESSION: Dict[str, ConversationState] = {}
 
@@ -50,10 +53,10 @@ def handle_merchant_chat(thread_id: str, user_text: str, merchant_id: int) -> di
         # Process conversation using enhanced modules
         # 1) Late capture any fields from user message
         parsed = parse_all(user_text)
-        if parsed["name"] and not state.name:         state.name = parsed["name"]
-        if parsed["phone"] and not state.phone:       state.phone = parsed["phone"]
-        if parsed["style"] and not state.style:       state.style = parsed["style"]
-        if parsed["location"] and not state.location: state.location = parsed["location"]
+        for field in LATE_FIELDS:
+            value = parsed[field]
+            if value and not getattr(state, field):
+                setattr(state, field, value)
         
         # 2) Try to answer with enhanced RAG (includes intent detection and portfolio preview)
         rag_response = maybe_rag_line(user_text)
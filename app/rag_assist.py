@@ -1,5 +1,9 @@
 # rag_assist.py
+import threading
+import time
+from collections import OrderedDict
 from typing import Optional
+from app.indexer import index_version
 from app.retriever import search
 
 INFO_TRIGGERS = (
@@ -7,10 +11,35 @@ INFO_TRIGGERS = (
     "portfolio", "past project", "projects", "process", "services", "quote"
 )
 
+# Users repeat common questions, so answers are cached until the index changes or they age out
+RAG_LINE_CACHE_SIZE = 2048
+RAG_LINE_TTL_SECONDS = 600
+_rag_line_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_rag_line_lock = threading.Lock()
+
 def maybe_rag_line(user_text: str, max_chars: int = 220) -> Optional[str]:
     t = (user_text or "").lower()
     if not any(k in t for k in INFO_TRIGGERS):
         return None
+    key = (user_text, max_chars)
+    now = time.monotonic()
+    version = index_version()
+    with _rag_line_lock:
+        cached = _rag_line_cache.get(key)
+        if cached and cached[1] == version and now - cached[2] < RAG_LINE_TTL_SECONDS:
+            _rag_line_cache.move_to_end(key)
+            return cached[0]
+    line = _rag_line(user_text, max_chars)
+    # search() returns no hits on errors too, so misses are not cached
+    if line is not None:
+        with _rag_line_lock:
+            _rag_line_cache[key] = (line, version, now)
+            _rag_line_cache.move_to_end(key)
+            while len(_rag_line_cache) > RAG_LINE_CACHE_SIZE:
+                _rag_line_cache.popitem(last=False)
+    return line
+
+def _rag_line(user_text: str, max_chars: int) -> Optional[str]:
     hits = search(user_text, top_k=2) or []
     if not hits: return None
     h = hits[0]
@@ -1,37 +1,47 @@
 """Content retrieval and search functionality for RAG system."""
 
 from typing import List, Dict, Any
-from app.indexer import collection, embed_texts
+from app.indexer import collection, embed_queries
 
 def search(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
     """Search for relevant content using OpenAI embeddings."""
+    return search_batch([query], top_k=top_k)[0]
+
+def search_batch(queries: List[str], top_k: int = 5) -> List[List[Dict[str, Any]]]:
+    """Search several queries with one embedding request and one Chroma query."""
+    if not queries:
+        return []
+
     try:
-        # Generate embedding for the query using OpenAI
-        query_embedding = embed_texts([query])[0]
-        
-        # Search in Chroma using the embedding
+        # Generate embeddings for all queries in a single OpenAI request
+        query_embeddings = embed_queries(queries)
+
+        # Search in Chroma using the embeddings
         results = collection.query(
-            query_embeddings=[query_embedding],
+            query_embeddings=query_embeddings,
             n_results=top_k,
             include=['documents', 'metadatas', 'distances']
         )
-        
-        # Process results
-        hits = []
-        if results['documents'] and results['documents'][0]:
-            for i in range(len(results['documents'][0])):
-                distance = results['distances'][0][i]
+
+        # Process results, one hit list per query
+        batched_hits = []
+        for q in range(len(queries)):
+            hits = []
+            documents = results['documents'][q] if results['documents'] else []
+            for i in range(len(documents)):
+                distance = results['distances'][q][i]
                 # For cosine distance, similarity = 1 - distance
                 similarity = max(0, 1 - distance)
-                
+
                 hits.append({
-                    'text': results['documents'][0][i],
-                    'meta': results['metadatas'][0][i],
+                    'text': documents[i],
+                    'meta': results['metadatas'][q][i],
                     'similarity_score': similarity
                 })
-        
-        return hits
-        
+            batched_hits.append(hits)
+
+        return batched_hits
+
     except Exception as e:
         print(f"Search error: {str(e)}")
-        return []
\ No newline at end of file
+        return [[] for _ in queries]
@@ -0,0 +1,89 @@
+"""
+Semantic response cache for the chat endpoint.
+Reuses an LLM reply when a new (rewritten) query lands close in embedding space
+to one already answered from the same retrieved context, skipping the chat
+completion round-trip. Entries expire after a TTL that is refreshed on each hit.
+"""
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+from app.indexer import embed_queries
+
+# Off by default: each checked turn costs an extra query embedding, and keys that
+# include the conversation summary and history rarely repeat
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+# Maximum cosine distance between query embeddings for a cached reply to be reused
+SEMANTIC_CACHE_DISTANCE = float(os.getenv("SEMANTIC_CACHE_DISTANCE", "0.1"))
+SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+# Cap on distinct contexts kept (least recently used are dropped) and on queries per context
+SEMANTIC_CACHE_MAX_CONTEXTS = int(os.getenv("SEMANTIC_CACHE_MAX_CONTEXTS", "2048"))
+SEMANTIC_CACHE_PER_CONTEXT = 16
+
+
+class SemanticCache:
+    """In-process semantic cache of replies, bucketed by an exact context key."""
+
+    def __init__(self, distance_threshold: float = SEMANTIC_CACHE_DISTANCE,
+                 ttl_seconds: int = SEMANTIC_CACHE_TTL_SECONDS,
+                 max_contexts: int = SEMANTIC_CACHE_MAX_CONTEXTS,
+                 per_context: int = SEMANTIC_CACHE_PER_CONTEXT):
+        self.distance_threshold = distance_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_contexts = max_contexts
+        self.per_context = per_context
+        # context key -> list of [unit vector, reply, expires_at]
+        self._buckets: "OrderedDict[str, List[list]]" = OrderedDict()
+
+    @staticmethod
+    def context_key(*parts: str) -> str:
+        """Hash the prompt pieces a reply depends on besides the query itself."""
+        h = hashlib.sha1()
+        for part in parts:
+            h.update((part or "").encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    @staticmethod
+    def embed(text: str) -> Optional[np.ndarray]:
+        """Embed and L2-normalise a query, or None if the embedding call fails."""
+        try:
+            vec = np.asarray(embed_queries([text])[0], dtype=np.float32)
+        except Exception as e:
+            print(f"Error embedding query for semantic cache: {e}")
+            return None
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else None
+
+    def check(self, key: str, vector: np.ndarray) -> Optional[str]:
+        """Return a cached reply for a near-duplicate query under the same context."""
+        entries = self._buckets.get(key)
+        if not entries:
+            return None
+        now = time.time()
+        entries[:] = [e for e in entries if e[2] > now]
+        if not entries:
+            del self._buckets[key]
+            return None
+        sims = np.stack([e[0] for e in entries]) @ vector
+        best = int(np.argmax(sims))
+        if 1.0 - float(sims[best]) > self.distance_threshold:
+            return None
+        entries[best][2] = now + self.ttl_seconds
+        self._buckets.move_to_end(key)
+        return entries[best][1]
+
+    def store(self, key: str, vector: np.ndarray, reply: str) -> None:
+        """Cache a reply for this context and query embedding."""
+        entries = self._buckets.setdefault(key, [])
+        entries.append([vector, reply, time.time() + self.ttl_seconds])
+        if len(entries) > self.per_context:
+            del entries[0]
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_contexts:
+            self._buckets.popitem(last=False)
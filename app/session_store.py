@@ -0,0 +1,113 @@
+"""
+Conversation session persistence.
+Stores per-thread session state in Redis when REDIS_URL is configured, so every
+uvicorn worker shares the same view of a conversation. Falls back to an
+bounded in-process LRU when Redis is not configured or not installed.
+"""
+
+import os
+import pickle
+from collections import OrderedDict
+from typing import Any, Optional
+
+# Optional Redis support. If not installed, sessions stay in-process.
+try:
+    import redis
+    HAS_REDIS = True
+except Exception:
+    HAS_REDIS = False
+
+REDIS_URL = os.getenv("REDIS_URL")
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(24 * 60 * 60)))
+# Cap on sessions kept per store by the in-process fallback (least recently used are dropped)
+LOCAL_SESSION_MAX = int(os.getenv("LOCAL_SESSION_MAX", "10000"))
+
+# Shared connection pool for all session stores
+_redis_client = None
+if HAS_REDIS and REDIS_URL:
+    try:
+        _redis_client = redis.Redis(connection_pool=redis.ConnectionPool.from_url(REDIS_URL))
+    except Exception as e:
+        print(f"Warning: Could not connect to Redis, using in-process sessions: {e}")
+        _redis_client = None
+
+
+class SessionStore:
+    """Key/value store for session objects, namespaced per conversation type."""
+
+    def __init__(self, namespace: str, ttl_seconds: int = SESSION_TTL_SECONDS,
+                 max_local: int = LOCAL_SESSION_MAX):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_local = max_local
+        self._local: "OrderedDict[str, Any]" = OrderedDict()
+        self._local_fields: "OrderedDict[tuple, Any]" = OrderedDict()
+
+    def _get_local(self, session_id: str) -> Optional[Any]:
+        value = self._local.get(session_id)
+        if value is not None:
+            self._local.move_to_end(session_id)
+        return value
+
+    def _save_local(self, session_id: str, value: Any) -> None:
+        self._local[session_id] = value
+        self._local.move_to_end(session_id)
+        while len(self._local) > self.max_local:
+            self._local.popitem(last=False)
+
+    def _key(self, session_id: str) -> str:
+        return f"session:{self.namespace}:{session_id}"
+
+    def _field_key(self, session_id: str, field: str) -> str:
+        return f"{self._key(session_id)}:{field}"
+
+    def get(self, session_id: str) -> Optional[Any]:
+        """Load a session, or None if it does not exist or has expired."""
+        if _redis_client is None:
+            return self._get_local(session_id)
+        try:
+            raw = _redis_client.get(self._key(session_id))
+            return pickle.loads(raw) if raw else None
+        except Exception as e:
+            print(f"Error loading session {session_id}: {e}")
+            return self._get_local(session_id)
+
+    def save(self, session_id: str, value: Any) -> None:
+        """Persist a session and refresh its TTL."""
+        if _redis_client is None:
+            self._save_local(session_id, value)
+            return
+        try:
+            _redis_client.setex(self._key(session_id), self.ttl_seconds,
+                                pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception as e:
+            print(f"Error saving session {session_id}: {e}")
+            self._save_local(session_id, value)
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def get_field(self, session_id: str, field: str) -> Optional[Any]:
+        """Load a value stored beside the session, or None if it does not exist or has expired."""
+        if _redis_client is None:
+            return self._local_fields.get((session_id, field))
+        try:
+            raw = _redis_client.get(self._field_key(session_id, field))
+            return pickle.loads(raw) if raw else None
+        except Exception as e:
+            print(f"Error loading session field {session_id}/{field}: {e}")
+            return self._local_fields.get((session_id, field))
+
+    def save_field(self, session_id: str, field: str, value: Any) -> None:
+        """Persist one value beside the session without rewriting the session itself."""
+        if _redis_client is not None:
+            try:
+                _redis_client.setex(self._field_key(session_id, field), self.ttl_seconds,
+                                    pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+                return
+            except Exception as e:
+                print(f"Error saving session field {session_id}/{field}: {e}")
+        self._local_fields[(session_id, field)] = value
+        self._local_fields.move_to_end((session_id, field))
+        while len(self._local_fields) > self.max_local:
+            self._local_fields.popitem(last=False)
@@ -3,10 +3,11 @@ Slot management for conversational AI.
 Handles conversation state, slot progression, and question generation.
 """
 
-from dataclasses import dataclass, asdict, field
+from dataclasses import dataclass, field
 from enum import Enum, auto
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 import random
+import time
 
 class Slot(Enum):
     NAME = auto()
@@ -41,7 +42,10 @@ APPOINTMENT_MESSAGES = [
     "Would you prefer a weekday or weekend appointment for the consultation?"
 ]
 
-@dataclass
+# Bound once so the appointment branch skips the module attribute lookup
+_APPT_CHOICE = random.choice
+
+@dataclass(slots=True)
 class ConversationState:
     user_id: str
     lead_id: Optional[str] = None
@@ -81,10 +85,46 @@ class ConversationState:
         return bool(self.name and self.phone and self.style and self.location)
     
     def to_dict(self): 
-        return asdict(self)
+        return {
+            "user_id": self.user_id,
+            "lead_id": self.lead_id,
+            "name": self.name,
+            "phone": self.phone,
+            "style": self.style,
+            "location": self.location,
+            "scope": self.scope,
+            "budget": self.budget,
+            "asked_phone_count": self.asked_phone_count,
+            "last_phone_prompt_turn": self.last_phone_prompt_turn,
+            "last_asked_field": self.last_asked_field,
+            "field_ask_counts": dict(self.field_ask_counts),
+            "last_field_ask_turn": dict(self.last_field_ask_turn),
+            "asked_name_phone_once": self.asked_name_phone_once,
+            "turn_index": self.turn_index,
+        }
+
+# Admin field configs change rarely; reload them at most once per TTL
+FIELD_CONFIG_TTL_SECONDS = 60
+_field_config_cache: Dict[str, object] = {"configs": None, "loaded_at": 0.0}
 
 def get_dynamic_field_configs() -> List[Dict]:
-    """Get field configurations from admin settings."""
+    """Get field configurations from admin settings, cached for FIELD_CONFIG_TTL_SECONDS."""
+    now = time.monotonic()
+    configs = _field_config_cache["configs"]
+    if configs is not None and now - _field_config_cache["loaded_at"] < FIELD_CONFIG_TTL_SECONDS:
+        return configs
+    
+    configs = _load_field_configs()
+    _field_config_cache["configs"] = configs
+    _field_config_cache["loaded_at"] = now
+    return configs
+
+def clear_field_config_cache():
+    """Drop cached field configs so the next turn reloads them from the admin DB."""
+    _field_config_cache["configs"] = None
+
+def _load_field_configs() -> List[Dict]:
+    """Load field configurations from admin settings."""
     try:
         from admin.admin_database import get_active_field_configs
         return get_active_field_configs()
@@ -100,26 +140,58 @@ def get_dynamic_field_configs() -> List[Dict]:
             {'field_name': 'scope', 'question_text': 'Which spaces are in scope? For example, living, kitchen, master bedroom.', 'is_required': False, 'sort_order': 6}
         ]
 
+# Derived views of the field configs, rebuilt only when the config list changes
+_derived_config_cache: Dict[str, object] = {"source": None, "required": [], "question_fields": {}, "field_questions": {}}
+
+def _derived_field_configs() -> Dict[str, object]:
+    """Get the sorted required list and question/field lookups for the current configs."""
+    configs = get_dynamic_field_configs()
+    if _derived_config_cache["source"] is not configs:
+        _derived_config_cache["required"] = sorted(
+            (f for f in configs if f['is_required']), key=lambda x: x['sort_order'])
+        question_fields = {}
+        field_questions = {}
+        for field_config in configs:
+            question_fields.setdefault(field_config['question_text'], field_config['field_name'])
+            field_questions.setdefault(field_config['field_name'], field_config['question_text'])
+        _derived_config_cache["question_fields"] = question_fields
+        _derived_config_cache["field_questions"] = field_questions
+        _derived_config_cache["source"] = configs
+    return _derived_config_cache
+
+def get_required_field_configs() -> List[Dict]:
+    """Get required field configs sorted by sort_order."""
+    return _derived_field_configs()["required"]
+
+def slot_status(state: ConversationState) -> Tuple[bool, Optional[str]]:
+    """Check appointment readiness and pick the next question in one pass over required fields.
+    
+    Returns (True, None) when every required field is collected, otherwise
+    (False, next_question). The chosen field is not marked as asked; call
+    mark_question_asked once the question is actually sent.
+    """
+    missing_fields = get_missing_required_fields(state)
+    if not missing_fields:
+        return True, None
+    return False, get_next_checklist_question(state, missing_fields=missing_fields)
+
+def mark_question_asked(state: ConversationState, question: str):
+    """Mark the field behind a checklist question as asked in this turn."""
+    field_name = _derived_field_configs()["question_fields"].get(question)
+    if field_name:
+        mark_field_asked(state, field_name)
+
 def dynamic_next_slot(state: ConversationState) -> Optional[str]:
     """Get next missing required field with checklist rotation logic."""
     next_question = get_next_checklist_question(state)
     if next_question:
-        # Extract field name from question to mark it
-        field_configs = get_dynamic_field_configs()
-        for field_config in field_configs:
-            if field_config['question_text'] == next_question:
-                mark_field_asked(state, field_config['field_name'])
-                break
+        mark_question_asked(state, next_question)
     return next_question
 
 def is_ready_for_appointment_dynamic(state: ConversationState) -> bool:
     """Check if all required fields are collected based on admin configuration."""
-    field_configs = get_dynamic_field_configs()
-    required_fields = [f for f in field_configs if f['is_required']]
-    
-    for field_config in required_fields:
-        field_name = field_config['field_name']
-        if not getattr(state, field_name, None):
+    for field_config in get_required_field_configs():
+        if not getattr(state, field_config['field_name'], None):
             return False
     
     return True
@@ -157,22 +229,20 @@ def get_checklist_progress(state: ConversationState) -> Dict[str, bool]:
 
 def get_missing_required_fields(state: ConversationState) -> List[str]:
     """Get list of missing required fields based on priority order."""
-    field_configs = get_dynamic_field_configs()
-    required_fields = [f for f in field_configs if f['is_required']]
-    required_fields.sort(key=lambda x: x['sort_order'])
-    
     missing = []
-    for field_config in required_fields:
+    for field_config in get_required_field_configs():
         field_name = field_config['field_name']
         if not getattr(state, field_name, None):
             missing.append(field_name)
     
     return missing
 
-def get_next_checklist_question(state: ConversationState, cooldown_turns: int = 2) -> Optional[str]:
+def get_next_checklist_question(state: ConversationState, cooldown_turns: int = 2,
+                                missing_fields: Optional[List[str]] = None) -> Optional[str]:
     """Get next question with intelligent rotation and cooldown."""
     # Get missing required fields
-    missing_fields = get_missing_required_fields(state)
+    if missing_fields is None:
+        missing_fields = get_missing_required_fields(state)
     if not missing_fields:
         return None
     
@@ -198,10 +268,9 @@ def get_next_checklist_question(state: ConversationState, cooldown_turns: int =
                     key=lambda f: state.field_ask_counts.get(f, 0))
     
     # Get the question text for this field
-    field_configs = get_dynamic_field_configs()
-    for field_config in field_configs:
-        if field_config['field_name'] == next_field:
-            return field_config['question_text']
+    question = _derived_field_configs()["field_questions"].get(next_field)
+    if question:
+        return question
     
     # Fallback to standard questions
     slot_map = {
@@ -223,12 +292,7 @@ def next_missing_after_portfolio(state: ConversationState) -> Optional[str]:
     """Get next missing field question after portfolio interaction with proper rotation."""
     next_question = get_next_checklist_question(state)
     if next_question:
-        # Extract field name from question to mark it
-        field_configs = get_dynamic_field_configs()
-        for field_config in field_configs:
-            if field_config['question_text'] == next_question:
-                mark_field_asked(state, field_config['field_name'])
-                break
+        mark_question_asked(state, next_question)
     return next_question
 
 def next_non_phone_slot_question(state: ConversationState) -> Optional[str]:
@@ -240,7 +304,7 @@ def next_non_phone_slot_question(state: ConversationState) -> Optional[str]:
 
 def generate_appointment_message(state: ConversationState) -> str:
     """Generate appointment scheduling message with user details."""
-    appointment_msg = random.choice(APPOINTMENT_MESSAGES)
+    appointment_msg = _APPT_CHOICE(APPOINTMENT_MESSAGES)
     return appointment_msg.format(
         name=state.name or 'there',
         phone=state.phone or 'your contact',
@@ -248,16 +312,18 @@ def generate_appointment_message(state: ConversationState) -> str:
         location=getattr(state, 'location', 'your location') or 'your location'
     )
 
+# Example hints appended to slot questions when re-asking
+SLOT_HINTS: Dict[Slot, str] = {
+    Slot.STYLE:    " For example, modern minimalist, warm neutral, or industrial.",
+    Slot.LOCATION: " For example, Mont Kiara, Bangsar, or Penang.",
+    Slot.SCOPE:    " For example, living and kitchen.",
+}
+
+# Slot questions with hints, built once at import
+QUESTIONS_WITH_HINTS: Dict[Slot, str] = {
+    slot: question + SLOT_HINTS.get(slot, "") for slot, question in QUESTIONS.items()
+}
+
 def get_slot_question_with_hints(slot: Slot) -> str:
     """Get slot question with helpful hints."""
-    question = QUESTIONS[slot]
-    hint = ""
-    
-    if slot == Slot.STYLE:    
-        hint = " For example, modern minimalist, warm neutral, or industrial."
-    elif slot == Slot.LOCATION: 
-        hint = " For example, Mont Kiara, Bangsar, or Penang."
-    elif slot == Slot.SCOPE:    
-        hint = " For example, living and kitchen."
-    
-    return question + hint
\ No newline at end of file
+    return QUESTIONS_WITH_HINTS[slot]
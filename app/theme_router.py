@@ -11,8 +11,11 @@ THEME_KEYS = [
 _map = json.loads(Path("theme_map.json").read_text())
 
 
+_NON_THEME_CHARS_RE = re.compile(r'[^a-z0-9\s-]+')
+
+
 def _normalize(text: str) -> str:
-    return re.sub(r'[^a-z0-9\s-]+', ' ', text.lower()).strip()
+    return _NON_THEME_CHARS_RE.sub(' ', text.lower()).strip()
 
 
 def detect_theme_query(text: str) -> bool:
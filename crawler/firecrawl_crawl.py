@@ -153,3 +153,13 @@ class FirecrawlClient:
             return test_result.success if hasattr(test_result, 'success') else False
         except Exception:
             return False
+
+
+_shared_client: Optional[FirecrawlClient] = None
+
+def get_firecrawl_client() -> FirecrawlClient:
+    """Return a process-wide FirecrawlClient, created on first use."""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = FirecrawlClient()
+    return _shared_client
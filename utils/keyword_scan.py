@@ -0,0 +1,61 @@
+# utils/keyword_scan.py
+# Single-pass multi-keyword scanner: reports which keyword groups occur in a text
+
+import re
+from typing import Dict, Iterable, Set
+
+# Optional Aho-Corasick support (recommended). If not installed, a compiled regex is used.
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except Exception:
+    HAS_AHOCORASICK = False
+
+
+class KeywordScanner:
+    """Match many substring keywords in one pass and return the tags that fired.
+
+    Matching is plain substring containment on already-lowercased text, the
+    same semantics as `any(k in text for k in KEYWORDS)`.
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        keyword_tags: Dict[str, Set[str]] = {}
+        for tag, keywords in groups.items():
+            for kw in keywords:
+                kw = kw.lower()
+                if kw:
+                    keyword_tags.setdefault(kw, set()).add(tag)
+
+        self._automaton = None
+        self._pattern = None
+        if not keyword_tags:
+            return
+
+        if HAS_AHOCORASICK:
+            self._automaton = ahocorasick.Automaton()
+            for kw, tags in keyword_tags.items():
+                self._automaton.add_word(kw, frozenset(tags))
+            self._automaton.make_automaton()
+        else:
+            # The regex reports one keyword per start position (the longest),
+            # so fold in the tags of every keyword that is a prefix of it.
+            self._tags = {
+                kw: frozenset().union(*(t for other, t in keyword_tags.items() if kw.startswith(other)))
+                for kw in keyword_tags
+            }
+            alternation = "|".join(re.escape(kw) for kw in sorted(keyword_tags, key=len, reverse=True))
+            self._pattern = re.compile(f"(?=({alternation}))")
+
+    def scan(self, text: str) -> Set[str]:
+        """Return the set of tags whose keywords occur in `text` (lowercased)."""
+        found: Set[str] = set()
+        if not text:
+            return found
+        if self._automaton is not None:
+            for _, tags in self._automaton.iter(text):
+                found |= tags
+        elif self._pattern is not None:
+            for m in self._pattern.finditer(text):
+                found |= self._tags[m.group(1)]
+        return found
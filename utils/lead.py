@@ -1,6 +1,10 @@
 # utils/lead.py
-import re
 import spacy
+from functools import lru_cache
+from .regex_compat import compile_pattern
+
+# Per-message memo size: the same turn text is checked by several helpers
+LEAD_CACHE_SIZE = 512
 
 # Load spaCy model for named entity recognition
 try:
@@ -32,6 +36,16 @@ def extract_name_with_spacy(text: str) -> str:
     
     return ""
 
+# Name patterns: "my name is [name]" or "i'm [name]" or "call me [name]" or "[name] here"
+NAME_PATTERNS = [compile_pattern(p) for p in (
+    r"my name is ([a-zA-Z]+(?:\s+[a-zA-Z]+)?)",  # Stop at first 1-2 words
+    r"i'?m ([a-zA-Z]+(?:\s+[a-zA-Z]+)?)",
+    r"name is ([a-zA-Z]+(?:\s+[a-zA-Z]+)?)",
+    r"call me ([a-zA-Z]+(?:\s+[a-zA-Z]+)?)",
+    r"^([a-zA-Z]+(?:\s+[a-zA-Z]+)?) here"  # "[Name] here" format
+)]
+
+@lru_cache(maxsize=LEAD_CACHE_SIZE)
 def extract_name(text: str) -> tuple[str, int]:
     """Extract name from user message using both spaCy NER and regex patterns."""
     
@@ -60,17 +74,8 @@ def extract_name(text: str) -> tuple[str, int]:
             return spacy_name, 3
     
     # Fallback to regex patterns for specific formats
-    # Pattern: "my name is [name]" or "i'm [name]" or "i am [name]" or "[name] here"
-    patterns = [
-        r"my name is ([a-zA-Z]+(?:\s+[a-zA-Z]+)?)",  # Stop at first 1-2 words
-        r"i'?m ([a-zA-Z]+(?:\s+[a-zA-Z]+)?)",
-        r"name is ([a-zA-Z]+(?:\s+[a-zA-Z]+)?)",
-        r"call me ([a-zA-Z]+(?:\s+[a-zA-Z]+)?)",
-        r"^([a-zA-Z]+(?:\s+[a-zA-Z]+)?) here"  # "[Name] here" format
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text_lower)
+    for pattern in NAME_PATTERNS:
+        match = pattern.search(text_lower)
         if match:
             name = match.group(1).strip().title()
             # Filter out common words and style-related words that aren't names
@@ -95,27 +100,43 @@ def extract_name(text: str) -> tuple[str, int]:
     
     return "", 0
 
+# Malaysian phone number patterns
+PHONE_PATTERNS = [compile_pattern(p) for p in (
+    r'(\+?6?01[0-9]{8,9})',  # Malaysian mobile
+    r'(\+?6?03[0-9]{8})',     # KL landline
+    r'(\+?6?0[4-9][0-9]{7,8})', # Other Malaysian numbers
+    r'([0-9]{10,11})',        # Generic 10-11 digit numbers
+    r'([0-9]{3}[-\s]?[0-9]{3}[-\s]?[0-9]{4})', # Formatted numbers
+)]
+PHONE_SEPARATOR_RE = compile_pattern(r'[-\s]')
+
+@lru_cache(maxsize=LEAD_CACHE_SIZE)
 def extract_phone(text: str) -> str:
     """Extract phone number from user message."""
-    # Malaysian phone number patterns
-    patterns = [
-        r'(\+?6?01[0-9]{8,9})',  # Malaysian mobile
-        r'(\+?6?03[0-9]{8})',     # KL landline
-        r'(\+?6?0[4-9][0-9]{7,8})', # Other Malaysian numbers
-        r'([0-9]{10,11})',        # Generic 10-11 digit numbers
-        r'([0-9]{3}[-\s]?[0-9]{3}[-\s]?[0-9]{4})', # Formatted numbers
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text)
+    for pattern in PHONE_PATTERNS:
+        match = pattern.search(text)
         if match:
-            phone = re.sub(r'[-\s]', '', match.group(1))
+            phone = PHONE_SEPARATOR_RE.sub('', match.group(1))
             # Basic validation - must be 10-12 digits
             if 10 <= len(phone) <= 12:
                 return phone
     
     return ""
 
+# Contact details removed before checking whether anything else was said
+LEAD_ONLY_STRIP_PATTERNS = [compile_pattern(p) for p in (
+    r"my name is [a-zA-Z\s]+",
+    r"i'?m [a-zA-Z\s]+",
+    r"i am [a-zA-Z\s]+",
+    r"name is [a-zA-Z\s]+",
+    r"call me [a-zA-Z\s]+",
+    r"\+?6?0[0-9]{8,11}",
+    r"[0-9]{10,12}",
+    r"[0-9]{3}[-\s]?[0-9]{3}[-\s]?[0-9]{4}",
+    r"phone", r"number", r"contact", r"reach"
+)]
+NON_ALPHA_RE = compile_pattern(r'[^a-zA-Z]')
+
 def is_lead_only(text: str) -> bool:
     """Check if message is only providing contact info without other questions."""
     text = text.lower().strip()
@@ -133,19 +154,9 @@ def is_lead_only(text: str) -> bool:
     
     # Remove contact info and see what's left
     temp = text
-    for pattern in [
-        r"my name is [a-zA-Z\s]+",
-        r"i'?m [a-zA-Z\s]+", 
-        r"i am [a-zA-Z\s]+",
-        r"name is [a-zA-Z\s]+",
-        r"call me [a-zA-Z\s]+",
-        r"\+?6?0[0-9]{8,11}",
-        r"[0-9]{10,12}",
-        r"[0-9]{3}[-\s]?[0-9]{3}[-\s]?[0-9]{4}",
-        r"phone", r"number", r"contact", r"reach"
-    ]:
-        temp = re.sub(pattern, '', temp)
+    for pattern in LEAD_ONLY_STRIP_PATTERNS:
+        temp = pattern.sub('', temp)
     
     # If less than 5 meaningful characters left, it's likely lead-only
-    meaningful_chars = re.sub(r'[^a-zA-Z]', '', temp)
+    meaningful_chars = NON_ALPHA_RE.sub('', temp)
     return len(meaningful_chars) < 5
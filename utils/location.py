@@ -2,6 +2,18 @@
 import re
 from .parser_my_style_location import extract_location as advanced_extract_location
 
+# Simple Malaysian location patterns, used when the advanced parser finds nothing
+LOCATION_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r"(?:in|at|from|located at)\s+([a-zA-Z\s,]+)",
+    r"my (?:house|home|office|shop|place) (?:is )?(?:in|at)\s+([a-zA-Z\s,]+)",
+    r"(?:condo|apartment|house|office|shop) in\s+([a-zA-Z\s,]+)",
+    r"(?:at|in)\s+([a-zA-Z\s,]+(?:heights|residences|suites|tower|gardens|park|mall|plaza|alam))",
+    r"location is\s+([a-zA-Z\s,]+)",
+    r"address is\s+([a-zA-Z\s,]+)",
+)]
+LOCATION_FILLER_RE = re.compile(r'\b(Is|The|At|In|My|House|Home|Office|Shop|Place|Condo|Apartment|Hmm|Well|Erm|Um|Oh|Lah|Ah)\b', re.IGNORECASE)
+MULTI_DOT_RE = re.compile(r'[.]{2,}')
+
 def extract_location(text: str) -> str:
     """Extract location information using advanced Malaysian location parser."""
     
@@ -13,16 +25,6 @@ def extract_location(text: str) -> str:
     # Fallback to simple patterns for edge cases
     text_lower = text.lower().strip()
     
-    # Simple Malaysian location patterns as backup
-    patterns = [
-        r"(?:in|at|from|located at)\s+([a-zA-Z\s,]+)",
-        r"my (?:house|home|office|shop|place) (?:is )?(?:in|at)\s+([a-zA-Z\s,]+)",
-        r"(?:condo|apartment|house|office|shop) in\s+([a-zA-Z\s,]+)",
-        r"(?:at|in)\s+([a-zA-Z\s,]+(?:heights|residences|suites|tower|gardens|park|mall|plaza|alam))",
-        r"location is\s+([a-zA-Z\s,]+)",
-        r"address is\s+([a-zA-Z\s,]+)",
-    ]
-    
     # Common Malaysian location keywords to help validate
     malaysian_indicators = [
         "kl", "kuala lumpur", "pj", "petaling jaya", "shah alam", "subang", "klang", 
@@ -35,13 +37,14 @@ def extract_location(text: str) -> str:
         "alam", "jaya", "sri", "taman", "bukit", "bandar"
     ]
     
-    for pattern in patterns:
-        match = re.search(pattern, text_lower, re.IGNORECASE)
+    # Simple Malaysian location patterns as backup
+    for pattern in LOCATION_PATTERNS:
+        match = pattern.search(text_lower)
         if match:
             location = match.group(1).strip()
             # Clean up common words and fillers
-            location = re.sub(r'\b(Is|The|At|In|My|House|Home|Office|Shop|Place|Condo|Apartment|Hmm|Well|Erm|Um|Oh|Lah|Ah)\b', '', location, flags=re.IGNORECASE).strip()
-            location = re.sub(r'[.]{2,}', '', location).strip()  # Remove multiple dots
+            location = LOCATION_FILLER_RE.sub('', location).strip()
+            location = MULTI_DOT_RE.sub('', location).strip()  # Remove multiple dots
             
             if location and len(location) > 2:
                 # Check if it contains Malaysian location indicators or just accept reasonable length locations
@@ -4,6 +4,7 @@
 from __future__ import annotations
 import re
 import unicodedata
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple
 
 # Optional fuzzy support (recommended). If not installed, code still runs without it.
@@ -17,11 +18,15 @@ except Exception:
 # Normalization utilities
 # -----------------------
 
+_NORM_DROP_RE = re.compile(r"[^\w\s\-'/]")
+_WHITESPACE_RE = re.compile(r"\s+")
+_CLAUSE_END_RE = re.compile(r"[.,;!?]")
+
 def norm(s: str) -> str:
     s = unicodedata.normalize("NFKC", s or "")
     s = s.lower()
-    s = re.sub(r"[^\w\s\-'/]", " ", s)  # keep letters/digits/space/-/'/
-    s = re.sub(r"\s+", " ", s).strip()
+    s = _NORM_DROP_RE.sub(" ", s)  # keep letters/digits/space/-/'/
+    s = _WHITESPACE_RE.sub(" ", s).strip()
     return s
 
 # -----------------------
@@ -156,18 +161,29 @@ LOCATION_HINTS_RE = re.compile(r"\b(in|at|near|around|area|located in|based in|a
 
 # Also a flat set of location terms for fuzzy
 LOCATION_TERMS = list(CITY_ALIASES.keys())
+# Aliases longest first, so the most specific one wins; sorted once here rather than per call
+ALIASES_LONGEST_FIRST = tuple(sorted(CITY_ALIASES.keys(), key=lambda x: -len(x)))
+
+# Per-message memo size: the same turn text flows through several helpers
+PARSE_CACHE_SIZE = 512
 
 # -----------------------
 # STYLE detection
 # -----------------------
 
 def extract_style(text: str, fuzzy: bool = True) -> Optional[Dict[str, str]]:
+    result = _extract_style_cached(text, fuzzy)
+    return dict(result) if result else None
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _extract_style_cached(text: str, fuzzy: bool) -> Optional[Dict[str, str]]:
     t = norm(text)
 
     # Exact/substring pass, prefer most specific (longest)
     best = None  # (theme, term, length)
     for term, theme in STYLE_TERMS:
-        if term and (term in t or re.search(rf"\b{re.escape(term)}\b", t)):
+        # A word-bounded match is always also a substring match
+        if term and term in t:
             if (best is None) or (len(term) > best[2]):
                 best = (theme, term, len(term))
 
@@ -202,10 +218,9 @@ def extract_style(text: str, fuzzy: bool = True) -> Optional[Dict[str, str]]:
 
 def _try_alias_lookup(candidate: str) -> Optional[str]:
     cand = norm(candidate)
-    # longest-first exact alias
-    for alias in sorted(CITY_ALIASES.keys(), key=lambda x: -len(x)):
-        if cand == alias:
-            return CITY_ALIASES[alias]
+    # exact alias
+    if cand in CITY_ALIASES:
+        return CITY_ALIASES[cand]
     # fuzzy alias
     if HAS_FUZZ:
         match = process.extractOne(cand, LOCATION_TERMS, scorer=fuzz.ratio)
@@ -242,11 +257,12 @@ def _extract_building_like(text_norm: str) -> Optional[str]:
             return " ".join(w.capitalize() for w in full_match.split())
     return None
 
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
 def extract_location(text: str) -> Optional[str]:
     t = " " + norm(text) + " "
 
     # 1) Direct alias scan (contains)
-    for alias in sorted(CITY_ALIASES.keys(), key=lambda x: -len(x)):
+    for alias in ALIASES_LONGEST_FIRST:
         if f" {alias} " in t:
             return CITY_ALIASES[alias]
 
@@ -255,7 +271,7 @@ def extract_location(text: str) -> Optional[str]:
     if m:
         span_end = m.end()
         cand = t[span_end:].strip()
-        cand = re.split(r"[.,;!?]", cand)[0]  # up to punctuation
+        cand = _CLAUSE_END_RE.split(cand, 1)[0]  # up to punctuation
         cand = cand[:50]  # limit
         # n-gram scan up to 3 tokens
         toks = [w for w in cand.split() if w]
@@ -0,0 +1,28 @@
+# utils/regex_compat.py
+# Compile per-turn patterns with RE2 (linear time, no backtracking) when it is installed
+
+import re
+
+# Optional RE2 support (google-re2). If not installed, the stdlib re module is used.
+try:
+    import re2
+    HAS_RE2 = True
+except Exception:
+    HAS_RE2 = False
+
+
+def compile_pattern(pattern: str, ignore_case: bool = False):
+    """Compile `pattern` with RE2 when available, else with `re`.
+
+    Both return objects with the same .search/.match/.sub/.split interface.
+    Patterns using features RE2 lacks (lookaround, backreferences) quietly
+    fall back to `re`.
+    """
+    if ignore_case:
+        pattern = "(?i)" + pattern
+    if HAS_RE2:
+        try:
+            return re2.compile(pattern)
+        except Exception:
+            pass
+    return re.compile(pattern)
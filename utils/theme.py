@@ -2,6 +2,7 @@
 import json
 import re
 import difflib
+from functools import lru_cache
 from pathlib import Path
 
 THEME_KEYS = [
@@ -19,15 +20,22 @@ def _load_theme_map():
 
 _theme_map = _load_theme_map()
 
+_NON_THEME_CHARS_RE = re.compile(r'[^a-z0-9\s-]+')
+
 def _normalize(text: str) -> str:
     """Normalize text for theme matching."""
-    return re.sub(r'[^a-z0-9\s-]+', ' ', text.lower()).strip()
+    return _NON_THEME_CHARS_RE.sub(' ', text.lower()).strip()
+
+# Per-message memo size: the theme map is loaded once, so both lookups are pure in `text`
+THEME_CACHE_SIZE = 1024
 
+@lru_cache(maxsize=THEME_CACHE_SIZE)
 def mentions_theme(text: str) -> bool:
     """Check if the text mentions theme-related keywords."""
     t = _normalize(text)
     return any(k in t for k in THEME_KEYS)
 
+@lru_cache(maxsize=THEME_CACHE_SIZE)
 def resolve_theme_url(text: str) -> str:
     """Return best matching theme URL or empty string if no good match."""
     if not _theme_map: